@@ -1,136 +1,448 @@
-import difflib
-from pathlib import Path
-import subprocess
-import re
-
-
-def sanitize_filename(filename):
-    """Convert string to valid filename"""
-    filename = re.sub(r'[<>:"/\\|?*]', '_', filename)
-    filename = filename.strip()
-    return filename
-
-
-def extract_keywords(text):
-    """Extract main keywords from text, removing common words."""
-    words = text.lower().split()
-    stop_words = {'pentesting', 'i', 'am', 'looking', 'for', 'something', 'called', 'an', 'a', 'the', 'help', 'with'}
-    keywords = [word for word in words if word not in stop_words]
-    return keywords
-
-
-def calculate_similarity(str1, str2):
-    """Calculate similarity with both sequence and keyword matching"""
-    # Basic sequence similarity
-    sequence_ratio = difflib.SequenceMatcher(None, str1.lower(), str2.lower()).ratio()
-
-    # Keyword similarity
-    keywords1 = set(extract_keywords(str1))
-    keywords2 = set(extract_keywords(str2))
-
-    if keywords1 and keywords2:
-        intersection = keywords1.intersection(keywords2)
-        union = keywords1.union(keywords2)
-        keyword_ratio = len(intersection) / len(union)
-    else:
-        keyword_ratio = 0
-
-    # Weighted combination (favoring keyword matching)
-    return (sequence_ratio * 0.3) + (keyword_ratio * 0.7)
-
-
-def compare_strings_and_build_path(string1, string2_file, base_path):
-    """Compare strings and build path from best match."""
-    try:
-        # Read file 2
-        with open(string2_file, 'r', encoding='utf-8') as f:
-            lines2 = f.readlines()
-
-        # Process string1 to handle newlines
-        lines1 = string1.split('\n')
-
-        best_match = None
-        best_ratio = 0
-        best_line_num = 0
-
-        # Extract port number if present in query
-        port_match = re.search(r'port (\d+)', string1.lower())
-        target_port = port_match.group(1) if port_match else None
-
-        # Compare each line
-        for i, line2 in enumerate(lines2, 1):
-            line2 = line2.strip()
-            if not line2:
-                continue
-
-            # Check for port match if we have a target port
-            if target_port and target_port in line2:
-                current_ratio = calculate_similarity(string1, line2) + 0.3  # Boost score for port match
-            else:
-                current_ratio = calculate_similarity(string1, line2)
-
-            if current_ratio > best_ratio:
-                best_ratio = current_ratio
-                best_match = line2
-                best_line_num = i
-
-        # Print comparison results
-        print("\nTop matching lines found:")
-        print("-" * 80)
-        print(f"Search query: {lines1[0]}")
-        print(f"Best match: {best_match}")
-        print(f"Similarity: {best_ratio * 100:.2f}%")
-
-        if best_match:
-            # Sanitize and build path
-            folder_name = sanitize_filename(best_match)
-            full_path = Path(base_path) / folder_name / f"{folder_name}.md"
-
-            if full_path.exists():
-                print(f"\nConstructed path: {full_path}")
-                return str(full_path), best_ratio
-            else:
-                print(f"\nWarning: Constructed path does not exist: {full_path}")
-                return None, best_ratio
-        else:
-            print("\nNo match found")
-            return None, 0
-
-    except Exception as e:
-        print(f"Error in comparison: {e}")
-        return None, 0
-
-
-def main():
-    # Configuration
-    base_path = r"C:\Users\james\PycharmProjects\webDataret\Working"
-    search_query_file = "myInput.txt"
-    reference_file = "Ports.txt"
-    next_script = "mdExtractForPrompt.py"
-
-    # Read search query
-    try:
-        with open(search_query_file, 'r', encoding='utf-8') as f:
-            search_query = f.read().strip()
-    except Exception as e:
-        print(f"Error reading search query: {e}")
-        return
-
-    # Compare and get path
-    path, similarity = compare_strings_and_build_path(search_query, reference_file, base_path)
-
-    # If we found a valid path and it's a good match (over 30% similar)
-    if path and similarity > 0.2:
-        try:
-            # Call the next script with the path as argument
-            subprocess.run(['python', next_script, path], check=True)
-        except subprocess.CalledProcessError as e:
-            print(f"Error running next script: {e}")
-        except Exception as e:
-            print(f"Error: {e}")
-    else:
-        print("No suitable match found or similarity too low")
-
-
-if __name__ == "__main__":
+from array import array
+import bisect
+from collections import Counter
+import difflib
+import json
+import os
+from pathlib import Path
+import re
+import threading
+
+import mdExtractForPrompt
+
+
+def _numpy():
+    """NumPy, imported only once batch matching needs it; None if it is not installed"""
+    try:
+        import numpy
+    except ImportError:  # batch matching falls back to one pure-Python pass per query
+        return None
+    return numpy
+
+BASE_PATH = r"C:\Users\james\PycharmProjects\webDataret\Working"
+REFERENCE_FILE = "Ports.txt"
+MIN_SIMILARITY = 0.2
+PORT_BOOST = 0.3
+# How many ranked candidates to try when the best match has no markdown file
+FALLBACK_CANDIDATES = 3
+# Queries scored together per NumPy block in batch_top_matches (bounds memory use)
+BATCH_BLOCK_SIZE = 64
+
+CORPUS_CACHE_VERSION = 1
+
+# Reference file path -> ReferenceCorpus, so a long-running process indexes Ports.txt once
+_reference_cache = {}
+_reference_lock = threading.Lock()
+
+
+def sanitize_filename(filename):
+    """Convert string to valid filename"""
+    filename = re.sub(r'[<>:"/\\|?*]', '_', filename)
+    filename = filename.strip()
+    return filename
+
+
+def extract_keywords(text):
+    """Extract main keywords from text, removing common words."""
+    words = text.lower().split()
+    stop_words = {'pentesting', 'i', 'am', 'looking', 'for', 'something', 'called', 'an', 'a', 'the', 'help', 'with'}
+    keywords = [word for word in words if word not in stop_words]
+    return keywords
+
+
+def calculate_similarity(str1, str2):
+    """Calculate similarity with both sequence and keyword matching"""
+    # Basic sequence similarity
+    sequence_ratio = difflib.SequenceMatcher(None, str1.lower(), str2.lower()).ratio()
+
+    # Keyword similarity
+    keywords1 = set(extract_keywords(str1))
+    keywords2 = set(extract_keywords(str2))
+
+    if keywords1 and keywords2:
+        intersection = keywords1.intersection(keywords2)
+        union = keywords1.union(keywords2)
+        keyword_ratio = len(intersection) / len(union)
+    else:
+        keyword_ratio = 0
+
+    return combine_ratios(sequence_ratio, keyword_ratio)
+
+
+def combine_ratios(sequence_ratio, keyword_ratio):
+    """Weighted combination (favoring keyword matching)"""
+    return (sequence_ratio * 0.3) + (keyword_ratio * 0.7)
+
+
+class QueryFeatures:
+    """Query-side matching features, computed once per query"""
+
+    def __init__(self, query):
+        self.text = query
+        self.lowered = query.lower()
+        self.keywords = set(extract_keywords(query))
+
+        # Extract port number if present in query
+        port_match = re.search(r'port (\d+)', self.lowered)
+        self.port = port_match.group(1) if port_match else None
+
+
+class ReferenceCorpus:
+    """The reference lines, pre-lowercased and tokenized once, plus inverted indexes.
+
+    Keywords are only needed as set sizes and postings, so each line keeps its
+    keyword count and every keyword keeps a compact array of line indexes. The
+    corpus remembers the mtime/size of its source file and can be saved to a JSON
+    cache so cold starts skip re-tokenization.
+
+    best_match() returns exactly what a full calculate_similarity() scan would, but
+    only runs SequenceMatcher on the candidates whose score upper bound can still
+    beat the best match found so far.
+    """
+
+    def __init__(self, lines, source_stamp=None):
+        self.source_stamp = source_stamp
+        self.lines = []
+        self.lowered = []
+        self.keyword_counts = array('I')
+        # keyword -> indexes of the lines containing it
+        self.postings = {}
+        # digit run -> indexes of the lines containing it, for the port boost
+        self.digit_runs = {}
+
+        for raw_line in lines:
+            line = raw_line.strip()
+            if not line:
+                continue
+
+            idx = len(self.lines)
+            keywords = set(extract_keywords(line))
+            self.lines.append(line)
+            self.lowered.append(line.lower())
+            self.keyword_counts.append(len(keywords))
+
+            for keyword in keywords:
+                self.postings.setdefault(keyword, array('I')).append(idx)
+            for run in set(re.findall(r'\d+', line)):
+                self.digit_runs.setdefault(run, array('I')).append(idx)
+
+    @staticmethod
+    def file_stamp(reference_file):
+        stat = os.stat(reference_file)
+        return [stat.st_mtime_ns, stat.st_size]
+
+    @classmethod
+    def from_file(cls, reference_file):
+        stamp = cls.file_stamp(reference_file)
+        with open(reference_file, 'r', encoding='utf-8') as f:
+            return cls(f.readlines(), source_stamp=stamp)
+
+    def is_current(self, reference_file):
+        """Whether the source file is unchanged since this corpus was built"""
+        try:
+            return self.source_stamp == self.file_stamp(reference_file)
+        except OSError:
+            return False
+
+    def save_cache(self, cache_file):
+        """Serialize the tokenized corpus so the next cold start can skip tokenization"""
+        data = {
+            "version": CORPUS_CACHE_VERSION,
+            "source_stamp": self.source_stamp,
+            "lines": self.lines,
+            "keyword_counts": self.keyword_counts.tolist(),
+            "postings": {keyword: ids.tolist() for keyword, ids in self.postings.items()},
+            "digit_runs": {run: ids.tolist() for run, ids in self.digit_runs.items()},
+        }
+        tmp_file = f"{cache_file}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f, separators=(',', ':'))
+        os.replace(tmp_file, cache_file)
+
+    @classmethod
+    def from_cache(cls, cache_file):
+        """Load a corpus saved by save_cache(), or None if the cache is unusable"""
+        try:
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get("version") != CORPUS_CACHE_VERSION:
+            return None
+
+        corpus = cls([], source_stamp=data["source_stamp"])
+        corpus.lines = data["lines"]
+        corpus.lowered = [line.lower() for line in corpus.lines]
+        corpus.keyword_counts = array('I', data["keyword_counts"])
+        corpus.postings = {keyword: array('I', ids) for keyword, ids in data["postings"].items()}
+        corpus.digit_runs = {run: array('I', ids) for run, ids in data["digit_runs"].items()}
+        return corpus
+
+    def port_lines(self, port):
+        """Indexes of the lines containing the port number as a substring"""
+        hits = set()
+        for run, indexes in self.digit_runs.items():
+            if port in run:
+                hits.update(indexes)
+        return hits
+
+    def _rank(self, features, keyword_ratio, upper_bound, boosted, shortlist, k):
+        """Exact top-k (line, score) pairs, best first, running SequenceMatcher only where needed"""
+        query_lower = features.lowered
+        # (-score, line index) pairs, kept sorted; ties go to the earliest line like a top-to-bottom scan
+        top = []
+
+        def with_boost(score, idx):
+            return score + PORT_BOOST if idx in boosted else score
+
+        def threshold():
+            return -top[-1][0] if len(top) == k else 0
+
+        def consider(candidates):
+            bounds = {idx: upper_bound(idx) for idx in candidates}
+            for idx in sorted(bounds, key=lambda i: (-bounds[i], i)):
+                if bounds[idx] < threshold():
+                    break
+                kw_ratio = keyword_ratio(idx)
+                matcher = difflib.SequenceMatcher(None, query_lower, self.lowered[idx])
+                if with_boost(combine_ratios(matcher.quick_ratio(), kw_ratio), idx) < threshold():
+                    continue
+                ratio = with_boost(combine_ratios(matcher.ratio(), kw_ratio), idx)
+                if ratio <= 0:
+                    continue
+                entry = (-ratio, idx)
+                if len(top) < k or entry < top[-1]:
+                    bisect.insort(top, entry)
+                    del top[k:]
+
+        consider(shortlist)
+
+        # Lines sharing no keyword and no port can score at most combine_ratios(1.0, 0)
+        if threshold() <= combine_ratios(1.0, 0):
+            consider(idx for idx in range(len(self.lines)) if idx not in shortlist)
+
+        return [(self.lines[idx], -neg_ratio) for neg_ratio, idx in top]
+
+    def top_matches(self, query, k=5):
+        """Return the k highest-scoring (line, score) pairs for one query, best first"""
+        features = query if isinstance(query, QueryFeatures) else QueryFeatures(query)
+        query_lower = features.lowered
+        query_keyword_count = len(features.keywords)
+        boosted = self.port_lines(features.port) if features.port else set()
+
+        overlap = Counter()
+        for keyword in features.keywords:
+            for idx in self.postings.get(keyword, ()):
+                overlap[idx] += 1
+
+        def keyword_ratio(idx):
+            line_keyword_count = self.keyword_counts[idx]
+            if not (query_keyword_count and line_keyword_count):
+                return 0
+            shared = overlap[idx]
+            return shared / (query_keyword_count + line_keyword_count - shared)
+
+        def upper_bound(idx):
+            # real_quick_ratio() only needs the two lengths
+            total = len(query_lower) + len(self.lowered[idx])
+            length_ratio = 2.0 * min(len(query_lower), len(self.lowered[idx])) / total if total else 1.0
+            score = combine_ratios(length_ratio, keyword_ratio(idx))
+            return score + PORT_BOOST if idx in boosted else score
+
+        return self._rank(features, keyword_ratio, upper_bound, boosted, set(overlap) | boosted, k)
+
+    def best_match(self, query):
+        """Return (line, score) of the highest-scoring line, or (None, 0)"""
+        matches = self.top_matches(query, k=1)
+        return matches[0] if matches else (None, 0)
+
+    def batch_top_matches(self, queries, k=5):
+        """Return top_matches(query, k) for every query, sharing one pass over the corpus.
+
+        Keyword overlap counts and score upper bounds for a block of queries are
+        computed together with NumPy, walking each distinct keyword's postings once
+        per block. Without NumPy this falls back to top_matches() per query.
+        """
+        features = [q if isinstance(q, QueryFeatures) else QueryFeatures(q) for q in queries]
+        np = _numpy()
+        if np is None or not self.lines:
+            return [self.top_matches(f, k) for f in features]
+
+        line_lengths = np.fromiter((len(line) for line in self.lowered), dtype=np.float64, count=len(self.lowered))
+        line_keyword_counts = np.frombuffer(self.keyword_counts, dtype=np.uint32).astype(np.float64)
+
+        results = []
+        for start in range(0, len(features), BATCH_BLOCK_SIZE):
+            block = features[start:start + BATCH_BLOCK_SIZE]
+
+            # One pass per distinct keyword over its postings, for every query in the block
+            overlap = np.zeros((len(block), len(self.lines)), dtype=np.float64)
+            queries_by_keyword = {}
+            for row, f in enumerate(block):
+                for keyword in f.keywords:
+                    queries_by_keyword.setdefault(keyword, []).append(row)
+            for keyword, rows in queries_by_keyword.items():
+                postings = self.postings.get(keyword)
+                if postings:
+                    overlap[np.ix_(rows, np.frombuffer(postings, dtype=np.uint32))] += 1
+
+            query_keyword_counts = np.array([len(f.keywords) for f in block], dtype=np.float64)[:, None]
+            union = query_keyword_counts + line_keyword_counts[None, :] - overlap
+            keyword_ratios = np.divide(overlap, union, out=np.zeros_like(overlap), where=union > 0)
+            keyword_ratios[(query_keyword_counts == 0)[:, 0], :] = 0
+            keyword_ratios[:, line_keyword_counts == 0] = 0
+
+            query_lengths = np.array([len(f.lowered) for f in block], dtype=np.float64)[:, None]
+            totals = query_lengths + line_lengths[None, :]
+            length_ratios = np.divide(2.0 * np.minimum(query_lengths, line_lengths[None, :]), totals,
+                                      out=np.ones_like(totals), where=totals > 0)
+            bounds = (length_ratios * 0.3) + (keyword_ratios * 0.7)
+
+            for row, f in enumerate(block):
+                boosted = self.port_lines(f.port) if f.port else set()
+                row_bounds = bounds[row]
+                if boosted:
+                    row_bounds = row_bounds.copy()
+                    row_bounds[list(boosted)] += PORT_BOOST
+                row_ratios = keyword_ratios[row]
+                shortlist = set(np.flatnonzero(overlap[row]).tolist()) | boosted
+                results.append(self._rank(
+                    f,
+                    lambda idx, r=row_ratios: float(r[idx]),
+                    lambda idx, b=row_bounds: float(b[idx]),
+                    boosted, shortlist, k,
+                ))
+
+        return results
+
+
+def load_reference_corpus(reference_file, cache_file=None):
+    """Return the corpus for the reference file, rebuilding it only when the file changes.
+
+    The in-process copy is reused while the file is unchanged; on a cold start the
+    JSON cache (default: <reference_file>.index.json) is used if it is still current.
+    """
+    # Pipeline stages run in worker threads; only one of them builds and saves a corpus
+    with _reference_lock:
+        corpus = _reference_cache.get(reference_file)
+        if corpus and corpus.is_current(reference_file):
+            return corpus
+
+        cache_file = cache_file or f"{reference_file}.index.json"
+        corpus = ReferenceCorpus.from_cache(cache_file)
+        if not (corpus and corpus.is_current(reference_file)):
+            corpus = ReferenceCorpus.from_file(reference_file)
+            try:
+                corpus.save_cache(cache_file)
+            except OSError as e:
+                print(f"Warning: could not write reference cache {cache_file}: {e}")
+
+        _reference_cache[reference_file] = corpus
+        return corpus
+
+
+def compare_strings_and_build_path(string1, string2_file, base_path):
+    """Compare strings and build path from best match."""
+    try:
+        # Load file 2 (tokenized and cached until it changes)
+        corpus = load_reference_corpus(string2_file)
+
+        # Process string1 to handle newlines
+        lines1 = string1.split('\n')
+
+        matches = corpus.top_matches(QueryFeatures(string1), k=FALLBACK_CANDIDATES)
+        return build_path_from_matches(lines1[0], matches, base_path)
+
+    except Exception as e:
+        print(f"Error in comparison: {e}")
+        return None, 0
+
+
+def build_path_from_matches(query_line, matches, base_path):
+    """Build the markdown path from ranked matches, falling back to the next match if a folder is missing."""
+    best_match, best_ratio = matches[0] if matches else (None, 0)
+
+    # Print comparison results
+    print("\nTop matching lines found:")
+    print("-" * 80)
+    print(f"Search query: {query_line}")
+    print(f"Best match: {best_match}")
+    print(f"Similarity: {best_ratio * 100:.2f}%")
+
+    if not best_match:
+        print("\nNo match found")
+        return None, 0
+
+    for match, ratio in matches:
+        # Sanitize and build path
+        folder_name = sanitize_filename(match)
+        full_path = Path(base_path) / folder_name / f"{folder_name}.md"
+
+        if full_path.exists():
+            if match != best_match:
+                print(f"Falling back to: {match} ({ratio * 100:.2f}%)")
+            print(f"\nConstructed path: {full_path}")
+            return str(full_path), ratio
+        print(f"\nWarning: Constructed path does not exist: {full_path}")
+
+    return None, best_ratio
+
+
+def batch_top_matches(queries, reference_file=REFERENCE_FILE, k=5):
+    """Return the top-k (line, score) pairs for each query, best first"""
+    corpus = load_reference_corpus(reference_file)
+    return corpus.batch_top_matches(queries, k)
+
+
+def find_markdown_paths(search_queries, reference_file=REFERENCE_FILE, base_path=BASE_PATH,
+                        min_similarity=MIN_SIMILARITY):
+    """find_markdown_path() for a whole batch, ranking every query in one pass over the corpus."""
+    try:
+        corpus = load_reference_corpus(reference_file)
+        ranked = corpus.batch_top_matches([QueryFeatures(q) for q in search_queries], k=FALLBACK_CANDIDATES)
+    except Exception as e:
+        print(f"Error in batch comparison: {e}")
+        return [None] * len(search_queries)
+
+    paths = []
+    for search_query, matches in zip(search_queries, ranked):
+        path, similarity = build_path_from_matches(search_query.split('\n')[0], matches, base_path)
+        if path and similarity > min_similarity:
+            paths.append(path)
+        else:
+            print("No suitable match found or similarity too low")
+            paths.append(None)
+    return paths
+
+
+def find_markdown_path(search_query, reference_file=REFERENCE_FILE, base_path=BASE_PATH, min_similarity=MIN_SIMILARITY):
+    """Return the markdown path for the best match, or None if the match is too weak."""
+    path, similarity = compare_strings_and_build_path(search_query, reference_file, base_path)
+    if path and similarity > min_similarity:
+        return path
+    print("No suitable match found or similarity too low")
+    return None
+
+
+def main():
+    # Configuration
+    search_query_file = "myInput.txt"
+
+    # Read search query
+    try:
+        with open(search_query_file, 'r', encoding='utf-8') as f:
+            search_query = f.read().strip()
+    except Exception as e:
+        print(f"Error reading search query: {e}")
+        return
+
+    # Compare and get path
+    path = find_markdown_path(search_query)
+
+    # List the sections of the matched file in-process instead of spawning mdExtractForPrompt
+    if path:
+        mdExtractForPrompt.write_available_sections(path)
+
+
+if __name__ == "__main__":
     main()
\ No newline at end of file
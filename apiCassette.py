@@ -0,0 +1,307 @@
+"""Record and replay HTTP traffic to the Claude and ElevenLabs APIs.
+
+A Cassette is a JSONL file with one recorded interaction per line: the request's
+method, path and body digest, the response status and headers, the time until
+the headers arrived and every body chunk with its arrival offset. Installed
+through apiClients.configure(cassette=...), it sits underneath every client this
+repo creates, so the whole pipeline can be recorded once against the live APIs
+and then replayed offline, at the original pace or faster:
+
+    python fastORC.py --record run.cassette --no-claude-cache --batch queries.jsonl
+    python fastORC.py --replay run.cassette --no-claude-cache --batch queries.jsonl --replay-speed 10
+
+Requests are matched on method, path and normalized body (the host is ignored);
+several recordings of the same request are handed out in turn. A request that
+was never recorded raises CassetteMiss, which is not retried.
+"""
+import asyncio
+import base64
+import functools
+import hashlib
+import json
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from apiScheduler import NonRetryableError
+from responseCache import normalize_value
+
+RECORD = "record"
+REPLAY = "replay"
+# Request headers that carry credentials are never written to a cassette
+SECRET_HEADERS = {"authorization", "x-api-key", "xi-api-key", "cookie"}
+SKIPPED_RESPONSE_HEADERS = {"set-cookie"}
+
+
+class CassetteMiss(NonRetryableError, LookupError):
+    """A replayed request has no recording; retrying cannot help, so nothing treats it as transient"""
+
+
+def request_key(method: str, path: str, body: bytes) -> str:
+    """Match key for a request; JSON bodies are compared after canonical normalization"""
+    try:
+        body = json.dumps(normalize_value(json.loads(body)), sort_keys=True).encode('utf-8')
+    except (ValueError, UnicodeDecodeError):
+        pass
+    return f"{method} {path} {hashlib.sha256(body).hexdigest()}"
+
+
+class Cassette:
+    """Recorded HTTP interactions, stored one JSON object per line.
+
+    mode "record" sends requests to the real API and appends what came back to
+    path; mode "replay" never touches the network and answers from path.
+    speed scales replayed delays: 1 is the original pace, 10 ten times faster
+    and 0 no waiting at all.
+    """
+
+    def __init__(self, path: str, mode: str = REPLAY, speed: float = 1.0):
+        if mode not in (RECORD, REPLAY):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self.speed = speed
+        self._lock = threading.Lock()
+        self._interactions: Dict[str, List[dict]] = defaultdict(list)
+        self._next: Dict[str, int] = defaultdict(int)
+        self.recorded = 0
+        self.replayed = 0
+        if mode == REPLAY:
+            self.load()
+
+    def load(self):
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    interaction = json.loads(line)
+                    self._interactions[interaction["key"]].append(interaction)
+
+    def __len__(self):
+        return sum(len(recordings) for recordings in self._interactions.values())
+
+    def save(self, interaction: dict):
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(interaction) + "\n")
+            self.recorded += 1
+
+    def find(self, key: str) -> Optional[dict]:
+        """The next recording for key, cycling through them; None if the request was never recorded"""
+        with self._lock:
+            recordings = self._interactions.get(key)
+            if not recordings:
+                return None
+            interaction = recordings[self._next[key] % len(recordings)]
+            self._next[key] += 1
+            self.replayed += 1
+            return interaction
+
+    @property
+    def records(self) -> bool:
+        return self.mode == RECORD
+
+    @property
+    def replays(self) -> bool:
+        return self.mode == REPLAY
+
+    def delay(self, seconds: float) -> float:
+        return seconds / self.speed if self.speed > 0 else 0.0
+
+    def transport(self, httpx_module, inner=None) -> "CassetteTransport":
+        """Transport for a client of httpx_module; inner is the real transport used while recording"""
+        if self.records and inner is None:
+            raise ValueError("Recording needs the real transport to send requests through")
+        return CassetteTransport(self, httpx_module, inner if self.records else None)
+
+
+class _RecordingStream:
+    """Passes the live body through unchanged while noting each chunk and when it arrived"""
+
+    def __init__(self, cassette: Cassette, interaction: dict, stream, started: float):
+        self.cassette = cassette
+        self.interaction = interaction
+        self.stream = stream
+        self.started = started
+        self.saved = False
+
+    def note(self, chunk: bytes):
+        offset = round(time.perf_counter() - self.started, 4)
+        self.interaction["chunks"].append([offset, base64.b64encode(chunk).decode('ascii')])
+
+    def __iter__(self):
+        for chunk in self.stream:
+            self.note(chunk)
+            yield chunk
+        self.finish(True)
+
+    async def __aiter__(self):
+        async for chunk in self.stream:
+            self.note(chunk)
+            yield chunk
+        self.finish(True)
+
+    def finish(self, complete: bool):
+        if not self.saved:
+            self.saved = True
+            self.interaction["complete"] = complete
+            self.cassette.save(self.interaction)
+
+    def close(self):
+        self.stream.close()
+        self.finish(False)
+
+    async def aclose(self):
+        await self.stream.aclose()
+        self.finish(False)
+
+
+class _ReplayStream:
+    """Yields recorded chunks, each no earlier than its (scaled) original offset"""
+
+    def __init__(self, cassette: Cassette, interaction: dict, started: float):
+        self.cassette = cassette
+        self.chunks = interaction["chunks"]
+        self.started = started
+
+    def wait(self, offset: float) -> float:
+        return self.cassette.delay(offset) - (time.perf_counter() - self.started)
+
+    def __iter__(self):
+        for offset, data in self.chunks:
+            remaining = self.wait(offset)
+            if remaining > 0:
+                time.sleep(remaining)
+            yield base64.b64decode(data)
+
+    async def __aiter__(self):
+        for offset, data in self.chunks:
+            remaining = self.wait(offset)
+            if remaining > 0:
+                await asyncio.sleep(remaining)
+            yield base64.b64decode(data)
+
+    def close(self):
+        pass
+
+    async def aclose(self):
+        pass
+
+
+@functools.lru_cache(maxsize=None)
+def _stream_type(stream_class: type, httpx_module) -> type:
+    # httpx only accepts response streams derived from its own byte stream classes
+    return type(stream_class.__name__, (stream_class, httpx_module.SyncByteStream, httpx_module.AsyncByteStream), {})
+
+
+class CassetteTransport:
+    """httpx transport (sync and async) that records through, or replays from, a Cassette.
+
+    httpx_module is the httpx package of the client it is mounted on: httpx itself
+    for the ElevenLabs client, whatever apiClients.sdk() resolves for Anthropic's.
+    """
+
+    def __init__(self, cassette: Cassette, httpx_module, inner=None):
+        self.cassette = cassette
+        self.httpx = httpx_module
+        self.inner = inner
+
+    def _new_interaction(self, request, body: bytes) -> dict:
+        path = request.url.raw_path.decode('ascii')
+        return {
+            "key": request_key(request.method, path, body),
+            "method": request.method,
+            "url": str(request.url.copy_with(query=None)),
+            "request_bytes": len(body),
+            "request_headers": {name: value for name, value in request.headers.items()
+                                if name.lower() not in SECRET_HEADERS},
+            "chunks": [],
+        }
+
+    def _recorded_response(self, interaction: dict, response, started: float):
+        interaction["status"] = response.status_code
+        interaction["headers"] = [[name, value] for name, value in response.headers.multi_items()
+                                  if name.lower() not in SKIPPED_RESPONSE_HEADERS]
+        interaction["latency"] = round(time.perf_counter() - started, 4)
+        stream = _stream_type(_RecordingStream, self.httpx)(self.cassette, interaction, response.stream, started)
+        return self.httpx.Response(response.status_code, headers=response.headers, stream=stream,
+                                   extensions=response.extensions)
+
+    def _replayed_response(self, interaction: dict, started: float):
+        stream = _stream_type(_ReplayStream, self.httpx)(self.cassette, interaction, started)
+        return self.httpx.Response(interaction["status"], headers=interaction["headers"], stream=stream)
+
+    def _lookup(self, request, body: bytes) -> dict:
+        key = self._new_interaction(request, body)["key"]
+        interaction = self.cassette.find(key)
+        if interaction is None:
+            raise CassetteMiss(f"No recorded response in {self.cassette.path} for {request.method} {request.url}")
+        return interaction
+
+    def handle_request(self, request):
+        started = time.perf_counter()
+        body = request.read()
+        if self.inner is not None:
+            interaction = self._new_interaction(request, body)
+            return self._recorded_response(interaction, self.inner.handle_request(request), started)
+
+        interaction = self._lookup(request, body)
+        latency = self.cassette.delay(interaction["latency"])
+        if latency > 0:
+            time.sleep(latency)
+        return self._replayed_response(interaction, started)
+
+    async def handle_async_request(self, request):
+        started = time.perf_counter()
+        body = await request.aread()
+        if self.inner is not None:
+            interaction = self._new_interaction(request, body)
+            return self._recorded_response(interaction, await self.inner.handle_async_request(request), started)
+
+        interaction = self._lookup(request, body)
+        latency = self.cassette.delay(interaction["latency"])
+        if latency > 0:
+            await asyncio.sleep(latency)
+        return self._replayed_response(interaction, started)
+
+    def close(self):
+        if self.inner is not None:
+            self.inner.close()
+
+    async def aclose(self):
+        if self.inner is not None:
+            await self.inner.aclose()
+
+    def __enter__(self):
+        if self.inner is not None:
+            self.inner.__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    async def __aenter__(self):
+        if self.inner is not None:
+            await self.inner.__aenter__()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+
+def add_arguments(parser):
+    """--record/--replay/--replay-speed options shared by the command-line entry points"""
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--record", metavar="FILE", help="record every API request/response to this cassette file")
+    group.add_argument("--replay", metavar="FILE",
+                       help="answer API requests from this cassette file instead of the network")
+    parser.add_argument("--replay-speed", type=float, default=1.0, metavar="X",
+                        help="replay X times faster than recorded; 0 = no delays (default: 1)")
+
+
+def from_arguments(args) -> Optional[Cassette]:
+    if args.record:
+        return Cassette(args.record, RECORD)
+    if args.replay:
+        return Cassette(args.replay, REPLAY, args.replay_speed)
+    return None
@@ -0,0 +1,155 @@
+import asyncio
+import functools
+import sys
+import threading
+import weakref
+from typing import TYPE_CHECKING, Dict, Optional
+
+import httpx
+
+if TYPE_CHECKING:
+    import anthropic
+
+DEFAULT_MAX_CONNECTIONS = 20
+DEFAULT_MAX_KEEPALIVE = 10
+DEFAULT_KEEPALIVE_EXPIRY = 30.0
+DEFAULT_TIMEOUT = 60.0
+DEFAULT_CONNECT_TIMEOUT = 10.0
+
+
+@functools.lru_cache(maxsize=None)
+def sdk():
+    """(anthropic, the httpx package it is built on), imported on first use.
+
+    The SDK takes longer to import than everything else in a stage together, and
+    it may be built on its own httpx fork (e.g. httpx2); its clients only accept
+    timeouts, pool limits and transports from that package.
+    """
+    import anthropic
+    return anthropic, sys.modules[type(anthropic.DEFAULT_CONNECTION_LIMITS).__module__.partition('.')[0]]
+
+
+class ClientSettings:
+    """Pool sizes and timeouts shared by every HTTP client this module hands out"""
+
+    def __init__(self, max_connections: int = DEFAULT_MAX_CONNECTIONS,
+                 max_keepalive: int = DEFAULT_MAX_KEEPALIVE, keepalive_expiry: float = DEFAULT_KEEPALIVE_EXPIRY,
+                 timeout: float = DEFAULT_TIMEOUT, connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+                 cassette=None):
+        self.max_connections = max_connections
+        self.max_keepalive = max_keepalive
+        self.keepalive_expiry = keepalive_expiry
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        # An apiCassette.Cassette to record through or replay from instead of plain network access
+        self.cassette = cassette
+
+    def limits(self, httpx_module=httpx):
+        return httpx_module.Limits(max_connections=self.max_connections,
+                                   max_keepalive_connections=self.max_keepalive,
+                                   keepalive_expiry=self.keepalive_expiry)
+
+    def timeouts(self, httpx_module=httpx):
+        return httpx_module.Timeout(self.timeout, connect=self.connect_timeout)
+
+    def transport(self, httpx_module=httpx, is_async: bool = False):
+        """Transport for a new client of httpx_module: None (the default) unless a cassette is installed"""
+        if self.cassette is None:
+            return None
+        inner = None
+        if self.cassette.records:
+            transport_type = httpx_module.AsyncHTTPTransport if is_async else httpx_module.HTTPTransport
+            inner = transport_type(limits=self.limits(httpx_module))
+        return self.cassette.transport(httpx_module, inner)
+
+
+settings = ClientSettings()
+_lock = threading.Lock()
+_sync_clients: Dict[str, object] = {}
+# Async clients are tied to the event loop whose connections they pool
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, object]]" = weakref.WeakKeyDictionary()
+
+
+def configure(max_connections: Optional[int] = None, max_keepalive: Optional[int] = None,
+              timeout: Optional[float] = None, connect_timeout: Optional[float] = None, cassette=None):
+    """Change pool sizes/timeouts or install a cassette; clients created afterwards use the new values"""
+    global settings
+    settings = ClientSettings(
+        max_connections if max_connections is not None else settings.max_connections,
+        max_keepalive if max_keepalive is not None else settings.max_keepalive,
+        settings.keepalive_expiry,
+        timeout if timeout is not None else settings.timeout,
+        connect_timeout if connect_timeout is not None else settings.connect_timeout,
+        cassette if cassette is not None else settings.cassette,
+    )
+    close_sync_clients()
+
+
+def _shared(key: str, factory):
+    with _lock:
+        client = _sync_clients.get(key)
+        if client is None:
+            client = _sync_clients[key] = factory()
+        return client
+
+
+def _shared_async(key: str, factory):
+    clients = _async_clients.setdefault(asyncio.get_running_loop(), {})
+    client = clients.get(key)
+    if client is None:
+        client = clients[key] = factory()
+    return client
+
+
+def http_client() -> httpx.Client:
+    """Process-wide keep-alive HTTP client; safe to share between threads"""
+    return _shared("http", lambda: httpx.Client(limits=settings.limits(), timeout=settings.timeouts(),
+                                                     transport=settings.transport()))
+
+
+def async_http_client() -> httpx.AsyncClient:
+    """Keep-alive HTTP client for the running event loop"""
+    return _shared_async("http", lambda: httpx.AsyncClient(limits=settings.limits(), timeout=settings.timeouts(),
+                                                                transport=settings.transport(is_async=True)))
+
+
+def _new_anthropic_client(api_key: str, is_async: bool):
+    anthropic, sdk_httpx = sdk()
+    client_type, http_client_type = ((anthropic.AsyncAnthropic, anthropic.DefaultAsyncHttpxClient) if is_async
+                                     else (anthropic.Anthropic, anthropic.DefaultHttpxClient))
+    # The SDK reports a cassette miss as a retryable connection error; replay leaves retries to apiScheduler
+    retries = {"max_retries": 0} if settings.cassette is not None and settings.cassette.replays else {}
+    # An empty key means none was configured here; the SDK then falls back to ANTHROPIC_API_KEY
+    return client_type(api_key=api_key or None, timeout=settings.timeouts(sdk_httpx), **retries,
+                       http_client=http_client_type(limits=settings.limits(sdk_httpx),
+                                                    timeout=settings.timeouts(sdk_httpx),
+                                                    transport=settings.transport(sdk_httpx, is_async)))
+
+
+def anthropic_client(api_key: str = '') -> "anthropic.Anthropic":
+    """Shared Anthropic client (one per API key) on a pooled connection"""
+    return _shared(f"anthropic:{api_key}", lambda: _new_anthropic_client(api_key, is_async=False))
+
+
+def async_anthropic_client(api_key: str = '') -> "anthropic.AsyncAnthropic":
+    """Shared async Anthropic client (one per API key) for the running event loop"""
+    return _shared_async(f"anthropic:{api_key}", lambda: _new_anthropic_client(api_key, is_async=True))
+
+
+def close_sync_clients():
+    """Close the shared synchronous clients; later calls create fresh ones"""
+    with _lock:
+        clients = list(_sync_clients.values())
+        _sync_clients.clear()
+    for client in clients:
+        client.close()
+
+
+async def close_async_clients():
+    """Close the shared async clients of the running event loop"""
+    clients = _async_clients.pop(asyncio.get_running_loop(), {})
+    for client in clients.values():
+        if isinstance(client, httpx.AsyncClient):
+            await client.aclose()
+        else:
+            await client.close()
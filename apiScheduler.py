@@ -0,0 +1,201 @@
+import asyncio
+import contextlib
+import contextvars
+import random
+import sys
+import time
+from collections import OrderedDict, deque
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable, Deque, Hashable, Optional, TypeVar
+
+import httpx
+
+T = TypeVar("T")
+
+# Statuses worth retrying: rate limiting, timeouts/conflicts and server-side failures (529 = overloaded)
+RETRYABLE_STATUS = {408, 409, 425, 429, 500, 502, 503, 504, 529}
+DEFAULT_MAX_RETRIES = 4
+DEFAULT_BASE_DELAY = 0.5
+DEFAULT_MAX_DELAY = 30.0
+
+# The query an API call is made for; waiting calls are admitted round-robin across queries
+current_query: "contextvars.ContextVar[Optional[Hashable]]" = contextvars.ContextVar("current_query", default=None)
+
+
+def error_status(error: BaseException) -> Optional[int]:
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """Seconds the server asked us to wait (Retry-After / retry-after-ms), if it said so"""
+    headers = getattr(error, "headers", None)
+    if headers is None:
+        headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class NonRetryableError(Exception):
+    """A failure that retrying cannot fix, even when a client wraps it as a connection error"""
+
+
+def is_retryable(error: BaseException) -> bool:
+    """True for rate limiting, transient server errors and dropped connections"""
+    cause = error
+    while cause is not None:
+        if isinstance(cause, NonRetryableError):
+            return False
+        cause = cause.__cause__
+    if isinstance(error, httpx.TransportError):
+        return True
+    # Only an already imported SDK can have raised its own error types
+    anthropic = sys.modules.get("anthropic")
+    if anthropic is not None and isinstance(error, anthropic.APIConnectionError):
+        return True
+    return error_status(error) in RETRYABLE_STATUS
+
+
+def retry_delay(error: BaseException, attempt: int, base_delay: float = DEFAULT_BASE_DELAY,
+                max_delay: float = DEFAULT_MAX_DELAY) -> float:
+    """Jittered exponential backoff, but never shorter than the server's Retry-After"""
+    delay = random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+    hint = retry_after(error)
+    return max(delay, hint) if hint is not None else delay
+
+
+class TokenBucket:
+    """Allows `rate` acquisitions per second on average, with bursts of up to `capacity`"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    async def acquire(self, tokens: float = 1.0):
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return
+            await asyncio.sleep((tokens - self.tokens) / self.rate)
+
+
+class FairLimiter:
+    """Concurrency limit whose waiters are admitted round-robin by key, not first come first served.
+
+    One query that fans out into many calls (e.g. chunked TTS) cannot starve the
+    others: each released slot goes to the next query in turn.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = max(1, limit)
+        self.active = 0
+        self.waiters: "OrderedDict[Hashable, Deque[asyncio.Future]]" = OrderedDict()
+
+    async def acquire(self, key: Hashable = None):
+        if self.active < self.limit and not self.waiters:
+            self.active += 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        self.waiters.setdefault(key, deque()).append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release()  # the slot was handed over just as we were cancelled
+            else:
+                queue = self.waiters.get(key)
+                if queue is not None and future in queue:
+                    queue.remove(future)
+                    if not queue:
+                        del self.waiters[key]
+            raise
+
+    def release(self):
+        while self.waiters:
+            key, queue = next(iter(self.waiters.items()))
+            future = queue.popleft()
+            if queue:
+                self.waiters.move_to_end(key)
+            else:
+                del self.waiters[key]
+            if not future.done():
+                future.set_result(None)  # hand the slot over; self.active is unchanged
+                return
+        self.active -= 1
+
+
+class ProviderLimiter:
+    """Concurrency, rate limit and retry policy for one API provider.
+
+    run() executes a call in a fair concurrency slot after taking a token from the
+    requests-per-minute bucket, and retries rate-limited and transient failures with
+    jittered exponential backoff. A Retry-After from the server pauses every call to
+    that provider, not just the one that received it.
+    """
+
+    def __init__(self, name: str, max_concurrency: int = 4, requests_per_minute: Optional[float] = None,
+                 max_retries: int = DEFAULT_MAX_RETRIES, base_delay: float = DEFAULT_BASE_DELAY,
+                 max_delay: float = DEFAULT_MAX_DELAY):
+        self.name = name
+        self.slots = FairLimiter(max_concurrency)
+        self.bucket = TokenBucket(requests_per_minute / 60) if requests_per_minute else None
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.paused_until = 0.0
+        self.retries = 0
+
+    @contextlib.asynccontextmanager
+    async def slot(self):
+        """Hold one concurrency slot (and one rate-limit token) for the duration of the block"""
+        await self.slots.acquire(current_query.get())
+        try:
+            pause = self.paused_until - time.monotonic()
+            if pause > 0:
+                await asyncio.sleep(pause)
+            if self.bucket:
+                await self.bucket.acquire()
+            yield
+        finally:
+            self.slots.release()
+
+    async def run(self, call: Callable[[], Awaitable[T]], retries: Optional[int] = None) -> T:
+        """Await call() under the provider's limits, retrying failures that are worth retrying"""
+        retries = self.max_retries if retries is None else retries
+        attempt = 0
+        while True:
+            async with self.slot():
+                try:
+                    return await call()
+                except Exception as e:
+                    if attempt >= retries or not is_retryable(e):
+                        raise
+                    delay = retry_delay(e, attempt, self.base_delay, self.max_delay)
+                    hint = retry_after(e)
+                    if hint:
+                        self.paused_until = max(self.paused_until, time.monotonic() + hint)
+                    reason = f"{error_status(e) or type(e).__name__}"
+            attempt += 1
+            self.retries += 1
+            print(f"{self.name} request failed ({reason}), retry {attempt}/{retries} in {delay:.1f}s...")
+            await asyncio.sleep(delay)
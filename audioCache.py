@@ -0,0 +1,94 @@
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Optional
+
+DEFAULT_CACHE_DIR = "tts_cache"
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024
+
+
+class AudioCache:
+    """Content-addressed store of synthesized audio with size-bounded LRU eviction.
+
+    Entries are keyed by a hash of everything that determines the audio (text,
+    voice, model, voice settings, output format), so a hit can skip the ElevenLabs
+    request entirely. File mtimes record recency; when the cache grows past
+    max_bytes the least recently used entries are deleted.
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.total_bytes = sum(p.stat().st_size for p in self.cache_dir.glob("*.audio"))
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(text: str, voice_id: str, model_id: str, voice_settings: Optional[dict] = None,
+                 output_format: Optional[str] = None, previous_text: Optional[str] = None,
+                 next_text: Optional[str] = None) -> str:
+        canonical = json.dumps({
+            "text": text,
+            "voice_id": voice_id,
+            "model_id": model_id,
+            "voice_settings": voice_settings,
+            "output_format": output_format,
+            "previous_text": previous_text,
+            "next_text": next_text,
+        }, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.audio"
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Return the cached audio for key, or None; a hit marks the entry as recently used"""
+        path = self._path(key)
+        try:
+            data = path.read_bytes()
+            os.utime(path)
+        except OSError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return data
+
+    def put(self, key: str, data: bytes):
+        """Store audio under key and evict least recently used entries beyond max_bytes"""
+        if not data or len(data) > self.max_bytes:
+            return
+        path = self._path(key)
+        tmp_path = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+        try:
+            tmp_path.write_bytes(data)
+            with self.lock:
+                previous_size = path.stat().st_size if path.exists() else 0
+                os.replace(tmp_path, path)
+                self.total_bytes += len(data) - previous_size
+                if self.total_bytes > self.max_bytes:
+                    self._evict()
+        except OSError as e:
+            print(f"Warning: could not write audio cache entry: {e}")
+
+    def _evict(self):
+        entries = []
+        for p in self.cache_dir.glob("*.audio"):
+            try:
+                stat = p.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, p))
+
+        self.total_bytes = sum(size for _, size, _ in entries)
+        for _, size, p in sorted(entries, key=lambda entry: entry[0]):
+            if self.total_bytes <= self.max_bytes:
+                break
+            try:
+                p.unlink()
+                self.total_bytes -= size
+            except OSError:
+                pass
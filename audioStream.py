@@ -0,0 +1,399 @@
+import concurrent.futures
+import io
+import queue
+import threading
+import time
+import wave
+from collections import deque
+from typing import Callable, Deque, Optional, Tuple
+
+from elevenLabsTTS import PCM_SAMPLE_RATE
+
+PCM_SAMPLE_SIZE = -16  # signed 16-bit, as pygame.mixer.get_init() reports it
+PCM_SAMPLE_WIDTH = 2
+PCM_CHANNELS = 1
+
+
+def ensure_pcm_mixer():
+    """(Re)initialize the mixer for raw PCM playback if it was set up for something else"""
+    import pygame
+    if pygame.mixer.get_init() != (PCM_SAMPLE_RATE, PCM_SAMPLE_SIZE, PCM_CHANNELS):
+        pygame.mixer.quit()
+        pygame.mixer.init(frequency=PCM_SAMPLE_RATE, size=PCM_SAMPLE_SIZE, channels=PCM_CHANNELS)
+
+
+def ensure_file_mixer():
+    """(Re)initialize the mixer with pygame's defaults for encoded files, instead of the mono PCM format"""
+    import pygame
+    if pygame.mixer.get_init() in (None, (PCM_SAMPLE_RATE, PCM_SAMPLE_SIZE, PCM_CHANNELS)):
+        pygame.mixer.quit()
+        pygame.mixer.init()
+
+
+class WavWriter:
+    """Writes PCM to a WAV file on its own thread, so feeding audio never blocks the caller (or event loop)"""
+
+    def __init__(self, path: str):
+        self.wav_file = wave.open(path, 'wb')
+        self.wav_file.setnchannels(PCM_CHANNELS)
+        self.wav_file.setsampwidth(PCM_SAMPLE_WIDTH)
+        self.wav_file.setframerate(PCM_SAMPLE_RATE)
+        self.frames: "queue.Queue[Optional[bytes]]" = queue.Queue()
+        self.closed = threading.Event()
+        self.error: Optional[Exception] = None
+        self._on_close: Optional[Callable[[], None]] = None
+        self.thread = threading.Thread(target=self._run, name="wav-writer", daemon=True)
+        self.thread.start()
+
+    def write(self, data: bytes):
+        self.frames.put(data)
+
+    def close(self, on_close: Optional[Callable[[], None]] = None):
+        """Finish the file after everything written so far; on_close runs once it is on disk"""
+        self._on_close = on_close
+        self.frames.put(None)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self.closed.wait(timeout)
+
+    def _run(self):
+        try:
+            while True:
+                data = self.frames.get()
+                if data is None:
+                    break
+                if self.error is None:
+                    try:
+                        self.wav_file.writeframes(data)
+                    except Exception as e:
+                        print(f"Error writing WAV file: {e}")
+                        self.error = e
+        finally:
+            try:
+                self.wav_file.close()
+            except Exception as e:
+                self.error = self.error or e
+            self.closed.set()
+            if self._on_close:
+                self._on_close()
+
+
+class AudioClip:
+    """One item of the playback queue: segments of raw 16-bit mono PCM.
+
+    future resolves to True once the clip has been played to the end, or to False
+    if it was aborted or failed (error then says why).
+    """
+
+    def __init__(self, jitter_segments: int = 1):
+        self.segments: "queue.Queue[Optional[bytes]]" = queue.Queue()
+        self.jitter_segments = jitter_segments
+        self.finished = False
+        self.done = threading.Event()
+        self.future: "concurrent.futures.Future[bool]" = concurrent.futures.Future()
+        self.error: Optional[Exception] = None
+        self._stop = threading.Event()
+
+    def abort(self):
+        """Stop playback immediately and discard anything still buffered"""
+        self._stop.set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until playback has finished; returns False on timeout"""
+        return self.done.wait(timeout)
+
+    def complete(self, error: Optional[Exception] = None):
+        if self.done.is_set():
+            return
+        self.error = error
+        self.done.set()
+        self.future.set_result(error is None and not self._stop.is_set())
+
+
+class EncodedClip(AudioClip):
+    """A whole encoded audio file (MP3, WAV, OGG), played through pygame.mixer.music"""
+
+    def __init__(self, data: bytes):
+        super().__init__()
+        self.data = data
+        self.finished = True
+
+
+class PcmStreamPlayer(AudioClip):
+    """Plays raw PCM audio while it is still being downloaded.
+
+    feed() chops incoming bytes into short segments, which the shared
+    PlaybackWorker starts playing once jitter_buffer_ms of audio is buffered (and
+    every clip queued before it has been handed to the audio device). If the
+    download falls behind, playback pauses until the jitter buffer has refilled.
+    With save_path the same audio is written to a WAV file as it arrives, on a
+    writer thread. A headless player never touches the audio device; it only saves
+    the audio, and is done once the file is complete.
+    """
+
+    def __init__(self, jitter_buffer_ms: int = 300, segment_ms: int = 100, save_path: Optional[str] = None,
+                 headless: bool = False, worker: Optional["PlaybackWorker"] = None):
+        super().__init__(max(1, round(jitter_buffer_ms / segment_ms)))
+        bytes_per_ms = PCM_SAMPLE_RATE * PCM_SAMPLE_WIDTH * PCM_CHANNELS / 1000
+        frame = PCM_SAMPLE_WIDTH * PCM_CHANNELS
+        self.segment_bytes = max(frame, int(segment_ms * bytes_per_ms) // frame * frame)
+        self.buffer = bytearray()
+        self.headless = headless
+
+        self.wav = WavWriter(save_path) if save_path else None
+
+        if not headless:
+            (worker or playback_worker()).enqueue(self)
+
+    def feed(self, data: bytes):
+        """Add downloaded audio; complete segments become playable immediately"""
+        if self.wav:
+            self.wav.write(data)
+        if self.headless:
+            return
+        self.buffer.extend(data)
+        while len(self.buffer) >= self.segment_bytes:
+            self.segments.put(bytes(self.buffer[:self.segment_bytes]))
+            del self.buffer[:self.segment_bytes]
+
+    def finish(self):
+        """Mark the download complete; the remaining audio is played out"""
+        if self.finished:
+            return
+        self.finished = True
+        tail = len(self.buffer) - len(self.buffer) % (PCM_SAMPLE_WIDTH * PCM_CHANNELS)
+        if tail:
+            self.segments.put(bytes(self.buffer[:tail]))
+        self.buffer.clear()
+        self.segments.put(None)
+        if self.wav:
+            self.wav.close(self.complete if self.headless else None)
+        elif self.headless:
+            self.complete()
+
+    def abort(self):
+        super().abort()
+        self.finish()
+
+    def complete(self, error: Optional[Exception] = None):
+        """Done once played (or saved) and the WAV file is complete"""
+        if self.wav and self.finished:
+            self.wav.wait()
+            error = error or self.wav.error
+        super().complete(error)
+
+
+class PlaybackWorker:
+    """Long-lived owner of the audio device that plays queued clips in order.
+
+    The mixer is set up for the PCM format ElevenLabs streams and stays up for the
+    life of the process. Every PCM clip plays on the same Channel and the next
+    clip's first segment is queued behind the previous clip's last one, so
+    consecutive answers play without a gap. Encoded files are not squeezed into that
+    22050 Hz mono format: once the audio before them has played out, the mixer is
+    switched to pygame's default (CD-quality stereo) format and they play through
+    pygame.mixer.music. Enqueueing never blocks: callers go on with the next query
+    and may wait on the clip's future if they need to.
+    """
+
+    def __init__(self):
+        self.clips: "queue.Queue[Optional[AudioClip]]" = queue.Queue()
+        self.thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._pending = 0
+        # (last sound handed to the channel, its clip) for clips whose tail is still playing
+        self._playing: Deque[Tuple[object, AudioClip]] = deque()
+
+    def enqueue(self, clip: AudioClip) -> "concurrent.futures.Future[bool]":
+        """Queue a clip for playback after everything queued before it"""
+        with self._lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name="audio-playback", daemon=True)
+                self.thread.start()
+            self._pending += 1
+            # Queued under the lock so a failing worker can't miss it while draining the queue
+            self.clips.put(clip)
+        clip.future.add_done_callback(self._clip_done)
+        return clip.future
+
+    def play_pcm(self, data: bytes) -> "concurrent.futures.Future[bool]":
+        """Queue complete 16-bit mono PCM audio"""
+        clip = AudioClip()
+        clip.segments.put(bytes(data))
+        clip.segments.put(None)
+        clip.finished = True
+        return self.enqueue(clip)
+
+    def play_file(self, path: str) -> "concurrent.futures.Future[bool]":
+        """Queue an audio file (MP3, WAV, OGG); it is read now, so it may be overwritten right away"""
+        with open(path, 'rb') as f:
+            return self.enqueue(EncodedClip(f.read()))
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """Block until every queued clip has played; returns False on timeout"""
+        with self._idle:
+            return self._idle.wait_for(lambda: self._pending == 0, timeout)
+
+    def close(self):
+        """Stop after the queued clips and release the audio device"""
+        with self._lock:
+            thread, self.thread = self.thread, None
+        if thread is not None:
+            self.clips.put(None)
+            thread.join()
+
+    def _clip_done(self, _future):
+        with self._idle:
+            self._pending -= 1
+            self._idle.notify_all()
+
+    def _settle(self, channel):
+        """Complete the clips whose last sound has left the channel"""
+        while self._playing:
+            sound, clip = self._playing[0]
+            if sound is not None and (sound is channel.get_sound() or sound is channel.get_queue()):
+                return
+            self._playing.popleft()
+            clip.complete(clip.error)
+
+    def _drain(self, channel):
+        """Wait until every PCM clip handed to the channel has played out"""
+        while self._playing:
+            self._settle(channel)
+            if self._playing:
+                time.sleep(0.01)
+
+    def _fail(self, error: Exception, current: Optional[AudioClip]):
+        """Give up on the audio device: every clip in flight or still queued completes with error"""
+        with self._lock:
+            # The next enqueue starts a fresh worker, which retries (or fails) right away
+            self.thread = None
+            clips = [clip for _, clip in self._playing]
+            self._playing.clear()
+            while True:
+                try:
+                    clips.append(self.clips.get_nowait())
+                except queue.Empty:
+                    break
+        if current is not None:
+            clips.append(current)
+        for clip in clips:
+            if clip is not None:
+                clip.complete(error)
+
+    def _run(self):
+        clip = None
+        try:
+            import pygame
+            ensure_pcm_mixer()
+            channel = pygame.mixer.Channel(0)
+            try:
+                while True:
+                    try:
+                        clip = self.clips.get(timeout=0.01 if self._playing else None)
+                    except queue.Empty:
+                        self._settle(channel)
+                        continue
+                    if clip is None:
+                        break
+                    try:
+                        if isinstance(clip, EncodedClip):
+                            if channel is not None:
+                                # The mixer can only change format once the PCM before the file is out
+                                self._drain(channel)
+                                channel = None
+                            self._play_file(pygame, clip)
+                            last_sound = None
+                        else:
+                            if channel is None:
+                                ensure_pcm_mixer()
+                                channel = pygame.mixer.Channel(0)
+                            last_sound = self._play(pygame, channel, clip)
+                    except Exception as e:
+                        print(f"Error during audio playback: {e}")
+                        clip.error = e
+                        last_sound = None
+                    self._playing.append((last_sound, clip))
+                    clip = None
+                    self._settle(channel)
+                while self._playing:
+                    time.sleep(0.01)
+                    self._settle(channel)
+            finally:
+                pygame.mixer.quit()
+        except Exception as e:
+            print(f"Audio playback failed: {e}")
+            self._fail(e, clip)
+
+    @staticmethod
+    def _play_file(pygame, clip: EncodedClip):
+        """Play an encoded file to the end (or until aborted) on the default-format mixer"""
+        ensure_file_mixer()
+        pygame.mixer.music.load(io.BytesIO(clip.data))
+        try:
+            pygame.mixer.music.play()
+            while pygame.mixer.music.get_busy() and not clip._stop.is_set():
+                time.sleep(0.01)
+            pygame.mixer.music.stop()
+        finally:
+            pygame.mixer.music.unload()
+
+    def _play(self, pygame, channel, clip: AudioClip):
+        """Hand the clip's segments to the channel as they arrive; returns the last sound queued"""
+        last_sound = None
+        end_of_stream = False
+        while not end_of_stream and not clip._stop.is_set():
+            # (Re)fill the jitter buffer before starting or resuming playback
+            while (clip.segments.qsize() < clip.jitter_segments and not clip.finished
+                   and not clip._stop.is_set()):
+                self._settle(channel)
+                time.sleep(0.01)
+
+            while not clip._stop.is_set():
+                try:
+                    segment = clip.segments.get(timeout=0.01)
+                except queue.Empty:
+                    self._settle(channel)
+                    if not channel.get_busy():
+                        break  # underrun: go back to buffering
+                    continue
+                if segment is None:
+                    end_of_stream = True
+                    break
+
+                sound = pygame.mixer.Sound(buffer=segment)
+                if not channel.get_busy():
+                    channel.play(sound)
+                else:
+                    # Channel.queue() holds one sound; wait for room to keep playback gapless
+                    while channel.get_queue() is not None and not clip._stop.is_set():
+                        self._settle(channel)
+                        time.sleep(0.005)
+                    channel.queue(sound)
+                last_sound = sound
+                self._settle(channel)
+
+        if clip._stop.is_set():
+            if last_sound is not None:
+                channel.stop()
+            return None
+        return last_sound
+
+
+_worker: Optional[PlaybackWorker] = None
+_worker_lock = threading.Lock()
+
+
+def playback_worker() -> PlaybackWorker:
+    """The process-wide playback worker; its thread starts with the first clip"""
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            _worker = PlaybackWorker()
+        return _worker
+
+
+def wait_for_playback(timeout: Optional[float] = None) -> bool:
+    """Block until all queued audio has played (immediately if nothing was ever queued)"""
+    return _worker is None or _worker.wait_idle(timeout)
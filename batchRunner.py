@@ -0,0 +1,116 @@
+import asyncio
+import json
+import time
+from typing import Dict, List, Optional
+
+from pipelineEngine import QueryPipeline, RequestContext
+from responseCache import normalize_text
+
+DEFAULT_PARALLELISM = 8
+
+
+def read_queries(input_file: str) -> List[dict]:
+    """Read a batch: JSONL objects with a "query" (and optional "id"), JSON strings, or plain lines"""
+    queries = []
+    with open(input_file, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                item = json.loads(line)
+            except ValueError:
+                item = line
+            if isinstance(item, str):
+                item = {"query": item}
+            if not isinstance(item, dict) or not str(item.get("query", "")).strip():
+                print(f"Skipping line {line_number} of {input_file}: no query")
+                continue
+            item.setdefault("id", line_number)
+            queries.append(item)
+    return queries
+
+
+def result_record(item: dict, ctx: RequestContext, total_seconds: float, shared: bool = False) -> dict:
+    return {
+        "id": item["id"],
+        "query": item["query"],
+        "markdown_path": ctx.markdown_path,
+        "section_numbers": ctx.section_numbers,
+        "answer": ctx.answer_text,
+        "error": ctx.error,
+        "timings": {stage: round(seconds, 4) for stage, seconds in ctx.timings.items()},
+        "total_seconds": round(total_seconds, 4),
+        "deduplicated": shared,
+    }
+
+
+async def run_batch(pipeline: QueryPipeline, queries: List[dict], output_file: str,
+                    parallelism: int = DEFAULT_PARALLELISM, speak: bool = False) -> int:
+    """Answer every query with at most `parallelism` in flight; returns how many failed.
+
+    Results are appended to output_file as JSON lines as soon as each query
+    finishes. Queries that are identical once normalized run once and share the
+    result. Every distinct query is matched against the reference file up front in
+    one pass; markdown files matched by several queries are parsed once through the
+    pipeline's index cache, and concurrent identical Claude requests share one call.
+    """
+    limit = asyncio.Semaphore(max(1, parallelism))
+    runs: Dict[str, asyncio.Future] = {}
+    failed = 0
+
+    distinct: Dict[str, str] = {}
+    for item in queries:
+        distinct.setdefault(normalize_text(str(item["query"])), str(item["query"]).strip())
+    matched = await asyncio.to_thread(pipeline.match_batch, list(distinct.values()))
+    contexts: Dict[str, RequestContext] = dict(zip(distinct, matched))
+
+    async def run_query(key: str, query: str):
+        async with limit:
+            started = time.perf_counter()
+            ctx = await pipeline.run(query, speak=speak, ctx=contexts[key])
+            return ctx, time.perf_counter() - started
+
+    with open(output_file, 'w', encoding='utf-8') as out:
+        async def answer(item: dict):
+            nonlocal failed
+            key = normalize_text(str(item["query"]))
+            shared = key in runs
+            if not shared:
+                runs[key] = asyncio.ensure_future(run_query(key, str(item["query"]).strip()))
+            try:
+                ctx, total_seconds = await runs[key]
+            except Exception as e:
+                ctx, total_seconds = RequestContext(item["query"]), 0.0
+                ctx.error = f"Unexpected error: {e}"
+            if ctx.error:
+                failed += 1
+            out.write(json.dumps(result_record(item, ctx, total_seconds, shared), ensure_ascii=False) + "\n")
+            out.flush()
+
+        await asyncio.gather(*(answer(item) for item in queries))
+    return failed
+
+
+async def run_batch_file(pipeline: QueryPipeline, input_file: str, output_file: str,
+                         parallelism: int = DEFAULT_PARALLELISM, speak: bool = False) -> Optional[int]:
+    """Read input_file, run the batch and print a summary; returns the failure count, or None if unreadable"""
+    try:
+        queries = read_queries(input_file)
+    except OSError as e:
+        print(f"Error reading batch file: {e}")
+        return None
+
+    print(f"Running {len(queries)} queries, {parallelism} at a time...")
+    start_time = time.time()
+    failed = await run_batch(pipeline, queries, output_file, parallelism, speak)
+    duration = time.time() - start_time
+
+    print("\n" + "=" * 50)
+    print("Batch Summary:")
+    print("=" * 50)
+    print(f"Queries answered: {len(queries) - failed}/{len(queries)}")
+    print(f"Results written to {output_file}")
+    print(f"Total execution time: {duration:.2f} seconds")
+    print("=" * 50)
+    return failed
@@ -0,0 +1,77 @@
+import random
+from pathlib import Path
+from typing import List
+
+SERVICES = [
+    "SSH", "HTTP", "HTTPS", "FTP", "SMB", "RDP", "DNS", "SMTP", "POP3", "IMAP", "LDAP", "MySQL",
+    "PostgreSQL", "MSSQL", "Oracle", "Redis", "MongoDB", "Elasticsearch", "Kerberos", "NFS", "SNMP",
+    "Telnet", "VNC", "WinRM", "RPC", "NetBIOS", "Memcached", "Docker", "Kubernetes", "Jenkins",
+]
+TOPICS = [
+    "enumeration", "brute force", "exploitation", "misconfiguration", "privilege escalation",
+    "banner grabbing", "default credentials", "pivoting", "hardening", "detection",
+]
+WORDS = (
+    "the service listens on a port and answers requests from clients while logging each "
+    "connection attempt so an operator can review scans credentials versions and errors later"
+).split()
+
+
+def reference_lines(count: int, seed: int = 0) -> List[str]:
+    """Distinct Ports.txt-style lines such as "SSH brute force port 22" """
+    rng = random.Random(seed)
+    lines, seen = [], set()
+    while len(lines) < count:
+        line = f"{rng.choice(SERVICES)} {rng.choice(TOPICS)} port {rng.randint(1, 65535)}"
+        if line not in seen:
+            seen.add(line)
+            lines.append(line)
+    return lines
+
+
+def generate_reference_file(path: Path, count: int, seed: int = 0) -> List[str]:
+    lines = reference_lines(count, seed)
+    path.write_text("\n".join(lines) + "\n", encoding='utf-8')
+    return lines
+
+
+def generate_markdown(path: Path, target_bytes: int, max_depth: int = 6, seed: int = 0,
+                      section_bytes: int = 2000, newline: str = "\n") -> int:
+    """Write a "---"-separated knowledge-base file of about target_bytes; returns the section count.
+
+    Header levels follow a random walk that only ever descends one level at a
+    time, so the nesting is as deep as max_depth and always well formed.
+    """
+    rng = random.Random(seed)
+    written = 0
+    level = 0
+    sections = 0
+    with open(path, 'w', encoding='utf-8', newline=newline) as f:
+        while written < target_bytes:
+            level = rng.randint(1, min(max_depth, level + 1))
+            body_words = max(1, section_bytes // 7)
+            paragraphs = []
+            while body_words > 0:
+                n = min(body_words, rng.randint(20, 80))
+                paragraphs.append(" ".join(rng.choice(WORDS) for _ in range(n)))
+                body_words -= n
+            text = f"{'#' * level} {rng.choice(TOPICS).title()} {sections}\n\n" + "\n\n".join(paragraphs)
+            separator = "\n---\n" if sections else ""
+            f.write(separator + text)
+            written += len(separator) + len(text)
+            sections += 1
+        f.write("\n")
+    return sections
+
+
+def generate_knowledge_base(base_dir: Path, titles: List[str], file_bytes: int, max_depth: int = 6,
+                            seed: int = 0) -> List[Path]:
+    """Create <base_dir>/<title>/<title>.md for each title, the layout InitialComparePasser expects"""
+    files = []
+    for i, title in enumerate(titles):
+        folder = base_dir / title
+        folder.mkdir(parents=True, exist_ok=True)
+        markdown_file = folder / f"{title}.md"
+        generate_markdown(markdown_file, file_bytes, max_depth, seed + i)
+        files.append(markdown_file)
+    return files
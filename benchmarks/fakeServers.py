@@ -0,0 +1,126 @@
+import http.server
+import json
+import math
+import struct
+import threading
+import time
+from typing import Tuple
+
+SELECTION_ANSWER = "1\n1.1\n2\n2.1"
+FINAL_ANSWER = (
+    "The service is reachable on its usual port. Start by grabbing the banner to learn the version. "
+    "Then check for default credentials and known misconfigurations. Finally review the logs for detection."
+)
+PCM_SAMPLE_RATE = 22050
+# One second of 16-bit PCM tone, repeated for longer clips
+TONE_SECOND = b"".join(struct.pack('<h', int(6000 * math.sin(i / 8))) for i in range(PCM_SAMPLE_RATE))
+
+
+class LatencyProfile:
+    """Delays the fake servers add: time to first byte, then a pause between streamed pieces"""
+
+    def __init__(self, first_byte: float = 0.2, per_chunk: float = 0.01, chars_per_second: float = 60.0):
+        self.first_byte = first_byte
+        self.per_chunk = per_chunk
+        # Speech length the fake TTS returns for a given amount of text
+        self.chars_per_second = chars_per_second
+
+
+class _QuietHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    profile = LatencyProfile()
+
+    def log_message(self, *args):
+        pass
+
+    def read_json(self) -> dict:
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def write_chunk(self, data: bytes):
+        self.wfile.write(b"%x\r\n" % len(data) + data + b"\r\n")
+        self.wfile.flush()
+
+    def start_chunked(self, content_type: str):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+
+class FakeClaudeHandler(_QuietHandler):
+    """Answers /v1/messages, both plain and streamed (SSE), with canned text"""
+
+    def do_POST(self):
+        body = self.read_json()
+        is_selection = "decide which topics" in json.dumps(body.get("system"))
+        text = SELECTION_ANSWER if is_selection else FINAL_ANSWER
+        usage = {"input_tokens": len(json.dumps(body.get("messages"))) // 4, "output_tokens": len(text) // 4}
+        time.sleep(self.profile.first_byte)
+
+        if not body.get("stream"):
+            data = json.dumps({
+                "id": "msg_bench", "type": "message", "role": "assistant", "model": body.get("model"),
+                "content": [{"type": "text", "text": text}], "stop_reason": "end_turn", "stop_sequence": None,
+                "usage": usage,
+            }).encode('utf-8')
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+            return
+
+        self.start_chunked("text/event-stream")
+
+        def event(kind: str, payload: dict):
+            self.write_chunk(f"event: {kind}\ndata: {json.dumps(payload)}\n\n".encode('utf-8'))
+
+        event("message_start", {"type": "message_start", "message": {
+            "id": "msg_bench", "type": "message", "role": "assistant", "model": body.get("model"), "content": [],
+            "stop_reason": None, "stop_sequence": None, "usage": dict(usage, output_tokens=0)}})
+        event("content_block_start", {"type": "content_block_start", "index": 0,
+                                      "content_block": {"type": "text", "text": ""}})
+        for word in text.split(" "):
+            event("content_block_delta", {"type": "content_block_delta", "index": 0,
+                                          "delta": {"type": "text_delta", "text": word + " "}})
+            time.sleep(self.profile.per_chunk)
+        event("content_block_stop", {"type": "content_block_stop", "index": 0})
+        event("message_delta", {"type": "message_delta", "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                                "usage": {"output_tokens": usage["output_tokens"]}})
+        event("message_stop", {"type": "message_stop"})
+        self.wfile.write(b"0\r\n\r\n")
+
+
+class FakeElevenLabsHandler(_QuietHandler):
+    """Streams a tone as 16-bit PCM, as long as the text would take to speak"""
+
+    CHUNK_BYTES = 4410
+
+    def do_POST(self):
+        body = self.read_json()
+        seconds = max(0.2, len(body.get("text", "")) / self.profile.chars_per_second)
+        audio = (TONE_SECOND * math.ceil(seconds))[:int(seconds * PCM_SAMPLE_RATE) * 2]
+        time.sleep(self.profile.first_byte)
+
+        self.start_chunked("audio/mpeg")
+        for i in range(0, len(audio), self.CHUNK_BYTES):
+            self.write_chunk(audio[i:i + self.CHUNK_BYTES])
+            time.sleep(self.profile.per_chunk)
+        self.wfile.write(b"0\r\n\r\n")
+
+
+def start_server(handler: type, profile: LatencyProfile, port: int = 0) -> Tuple[http.server.ThreadingHTTPServer, str]:
+    """Serve handler on 127.0.0.1 in a daemon thread; returns the server and its base URL"""
+    handler_class = type(handler.__name__, (handler,), {"profile": profile})
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", port), handler_class)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name=handler.__name__, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def start_fake_apis(profile: LatencyProfile):
+    """Start fake Claude and ElevenLabs servers; returns (servers, claude_url, elevenlabs_api_base)"""
+    claude, claude_url = start_server(FakeClaudeHandler, profile)
+    eleven, eleven_url = start_server(FakeElevenLabsHandler, profile)
+    return [claude, eleven], claude_url, f"{eleven_url}/v1"
@@ -0,0 +1,270 @@
+"""Reproducible benchmarks for reference matching, section parsing/extraction and the full pipeline.
+
+Synthetic corpora are generated from fixed seeds and the Claude and ElevenLabs
+APIs are replaced by local fake servers with configurable latency, so runs are
+comparable across machines and commits:
+
+    python benchmarks/runBenchmarks.py --preset quick --out bench.json
+    python benchmarks/runBenchmarks.py --preset quick --baseline bench.json --tolerance 0.25
+
+With --baseline the exit status is 1 when any benchmark's median got slower than
+the tolerance allows.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+# The pipeline benchmarks initialize pygame; never touch a real sound device
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import InitialComparePasser  # noqa: E402
+from corpora import generate_knowledge_base, generate_markdown, generate_reference_file  # noqa: E402
+from fakeServers import LatencyProfile, start_fake_apis  # noqa: E402
+from markdownisoBatch import MarkdownBatchExtractor  # noqa: E402
+from mdExtractForPrompt import MarkdownHierarchicalExtractor  # noqa: E402
+from sectionIndex import SectionIndex  # noqa: E402
+
+RESULTS_VERSION = 1
+
+PRESETS = {
+    "quick": {"reference_lines": [1000, 10000], "markdown_bytes": [100_000, 1_000_000],
+              "knowledge_base_files": 10, "pipeline_queries": 16, "repeats": 3},
+    "full": {"reference_lines": [1000, 10000, 100000], "markdown_bytes": [100_000, 10_000_000, 100_000_000],
+             "knowledge_base_files": 50, "pipeline_queries": 128, "repeats": 5},
+}
+
+
+def measure(run: Callable[[], object], repeats: int, setup: Optional[Callable[[], object]] = None) -> dict:
+    """Time run() `repeats` times (setup() before each, untimed); its output is discarded"""
+    timings = []
+    for _ in range(repeats):
+        if setup:
+            setup()
+        with contextlib.redirect_stdout(io.StringIO()):
+            started = time.perf_counter()
+            run()
+            timings.append(time.perf_counter() - started)
+    return {
+        "repeats": repeats,
+        "min_seconds": min(timings),
+        "median_seconds": statistics.median(timings),
+        "mean_seconds": statistics.fmean(timings),
+    }
+
+
+class BenchmarkResults:
+    def __init__(self, preset: str):
+        self.results: Dict[str, dict] = {}
+        self.meta = {
+            "version": RESULTS_VERSION,
+            "preset": preset,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "commit": self.git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+
+    @staticmethod
+    def git_commit() -> Optional[str]:
+        try:
+            return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                                  text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    def add(self, name: str, params: dict, result: dict):
+        key = f"{name}[{','.join(f'{k}={v}' for k, v in params.items())}]"
+        self.results[key] = dict(result, name=name, params=params)
+        print(f"{key:<60} median {result['median_seconds'] * 1000:10.2f} ms")
+
+    def to_dict(self) -> dict:
+        return {"meta": self.meta, "results": self.results}
+
+
+def bench_matching(results: BenchmarkResults, workdir: Path, sizes: List[int], repeats: int):
+    """compare_strings_and_build_path, cold (tokenizing Ports.txt) and warm, per reference size"""
+    for size in sizes:
+        reference_file = workdir / f"Ports_{size}.txt"
+        lines = generate_reference_file(reference_file, size)
+        queries = [f"looking for {line.lower()} help" for line in lines[::max(1, size // 20)][:20]]
+        cache_file = Path(f"{reference_file}.index.json")
+
+        def forget():
+            InitialComparePasser._reference_cache.clear()
+            if cache_file.exists():
+                cache_file.unlink()
+
+        results.add("matching.cold", {"lines": size}, measure(
+            lambda: InitialComparePasser.compare_strings_and_build_path(queries[0], str(reference_file), str(workdir)),
+            repeats, forget))
+        results.add("matching.warm_20_queries", {"lines": size}, measure(
+            lambda: [InitialComparePasser.compare_strings_and_build_path(q, str(reference_file), str(workdir))
+                     for q in queries],
+            repeats))
+
+
+def bench_sections(results: BenchmarkResults, workdir: Path, sizes: List[int], repeats: int):
+    """Both extract_sections implementations (cold parse and cached index), then section extraction"""
+    for size in sizes:
+        markdown_file = workdir / f"kb_{size}.md"
+        generate_markdown(markdown_file, size)
+        cache_file = SectionIndex.cache_path(markdown_file)
+        params = {"bytes": size}
+
+        def drop_index():
+            if cache_file.exists():
+                cache_file.unlink()
+
+        for label, extractor_class in (("mdExtractForPrompt", MarkdownHierarchicalExtractor),
+                                       ("markdownisoBatch", MarkdownBatchExtractor)):
+            results.add(f"extract_sections.{label}.cold", params,
+                        measure(lambda: extractor_class(markdown_file).extract_sections(), repeats, drop_index))
+            results.add(f"extract_sections.{label}.cached", params,
+                        measure(lambda: extractor_class(markdown_file).extract_sections(), repeats))
+
+        extractor = MarkdownBatchExtractor(markdown_file)
+        extractor.extract_sections()
+        extractor.build_section_map()
+        numbers = sorted(extractor.section_map)[:50]
+        extractor.output_file = str(workdir / "SuggestedHelp.txt")
+        results.add("get_section_content.50_sections", params,
+                    measure(lambda: [extractor.get_section_content(n) for n in numbers], repeats))
+        results.add("process_batch.50_sections", params, measure(lambda: extractor.process_batch(numbers), repeats))
+
+
+def bench_pipeline(results: BenchmarkResults, workdir: Path, files: int, queries: int, repeats: int,
+                   profile: LatencyProfile, parallel: int, with_audio: bool):
+    """The whole fastORC pipeline against fake APIs: one query at a time, then as a parallel batch"""
+    import apiClients
+    import elevenLabsTTS
+    from batchRunner import run_batch
+    from fastORC import APIHandler
+    from pipelineEngine import QueryPipeline
+    from stageTiming import tracer
+
+    servers, claude_url, eleven_base = start_fake_apis(profile)
+    elevenLabsTTS.API_BASE = eleven_base
+    # The handler's shared Anthropic client picks the endpoint and key up from the environment
+    os.environ["ANTHROPIC_BASE_URL"] = claude_url
+    os.environ["ANTHROPIC_API_KEY"] = "bench"
+    apiClients.sdk()  # imported here, so the first timed query does not pay for it
+
+    base_path = workdir / "Working"
+    reference_file = workdir / "Ports_pipeline.txt"
+    titles = generate_reference_file(reference_file, files, seed=1)
+    generate_knowledge_base(base_path, titles, 200_000)
+    batch = [{"id": i, "query": f"how do I test {titles[i % len(titles)].lower()}"} for i in range(queries)]
+    params = {"files": files, "latency_ms": int(profile.first_byte * 1000)}
+
+    async def run(fn):
+        handler = APIHandler(streaming_audio=True)
+        pipeline = QueryPipeline(handler, str(base_path), str(reference_file))
+        try:
+            await fn(pipeline)
+        finally:
+            await apiClients.close_async_clients()
+
+    async def one_query(pipeline):
+        ctx = await pipeline.run(batch[0]["query"], speak=False)
+        assert ctx.error is None, ctx.error
+
+    async def many_queries(pipeline):
+        failed = await run_batch(pipeline, batch, str(workdir / "batch_results.jsonl"), parallel)
+        assert failed == 0, f"{failed} batch queries failed"
+
+    async def spoken_query(pipeline):
+        ctx = await pipeline.run(batch[0]["query"], speak=True)
+        assert ctx.error is None, ctx.error
+
+    results.add("pipeline.single_query", params, measure(lambda: asyncio.run(run(one_query)), repeats))
+    results.add("pipeline.batch", dict(params, queries=queries, parallel=parallel),
+                measure(lambda: asyncio.run(run(many_queries)), repeats))
+    if with_audio:
+        results.add("pipeline.single_query_spoken", params, measure(lambda: asyncio.run(run(spoken_query)), repeats))
+
+    results.meta["stage_metrics"] = tracer.metrics()
+    for server in servers:
+        server.shutdown()
+
+
+def compare(results: dict, baseline_file: str, tolerance: float) -> bool:
+    """Print the change against a previous results file; False if anything regressed"""
+    with open(baseline_file, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)["results"]
+
+    regressions = 0
+    print(f"\nCompared with {baseline_file} (tolerance {tolerance:.0%}):")
+    for key, result in results["results"].items():
+        old = baseline.get(key)
+        if not old:
+            continue
+        ratio = result["median_seconds"] / old["median_seconds"] if old["median_seconds"] else 1.0
+        flag = ""
+        if ratio > 1 + tolerance:
+            flag = "  REGRESSION"
+            regressions += 1
+        print(f"{key:<60} {ratio:6.2f}x{flag}")
+    return regressions == 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark matching, section extraction and the full pipeline")
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="quick")
+    parser.add_argument("--only", choices=["matching", "sections", "pipeline"], action="append",
+                        help="run only these groups (repeatable)")
+    parser.add_argument("--repeats", type=int, help="override the preset's repeat count")
+    parser.add_argument("--latency-ms", type=float, default=200, help="fake API time to first byte (default: 200)")
+    parser.add_argument("--chunk-ms", type=float, default=10, help="fake API delay between streamed chunks (default: 10)")
+    parser.add_argument("--parallel", type=int, default=8, help="queries in flight in the batch benchmark")
+    parser.add_argument("--with-audio", action="store_true", help="also time a spoken query (plays in real time)")
+    parser.add_argument("--workdir", help="where corpora are generated (default: a temporary directory)")
+    parser.add_argument("--out", default="benchmark_results.json", help="results file (default: %(default)s)")
+    parser.add_argument("--baseline", help="previous results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown before flagging (default: 0.25)")
+    args = parser.parse_args()
+
+    preset = PRESETS[args.preset]
+    repeats = args.repeats or preset["repeats"]
+    groups = set(args.only or ["matching", "sections", "pipeline"])
+    workdir = Path(args.workdir) if args.workdir else Path(tempfile.mkdtemp(prefix="orc-bench-"))
+    workdir.mkdir(parents=True, exist_ok=True)
+    results = BenchmarkResults(args.preset)
+
+    try:
+        if "matching" in groups:
+            bench_matching(results, workdir, preset["reference_lines"], repeats)
+        if "sections" in groups:
+            bench_sections(results, workdir, preset["markdown_bytes"], repeats)
+        if "pipeline" in groups:
+            profile = LatencyProfile(args.latency_ms / 1000, args.chunk_ms / 1000)
+            bench_pipeline(results, workdir, preset["knowledge_base_files"], preset["pipeline_queries"], repeats,
+                           profile, args.parallel, args.with_audio)
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    data = results.to_dict()
+    with open(args.out, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+    print(f"\nResults written to {args.out}")
+
+    if args.baseline and not compare(data, args.baseline, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
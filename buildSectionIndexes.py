@@ -0,0 +1,131 @@
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from InitialComparePasser import BASE_PATH, REFERENCE_FILE, load_reference_corpus
+from sectionIndex import SectionIndex
+
+CATALOG_VERSION = 1
+CATALOG_FILE = "section_catalog.json"
+
+
+def find_markdown_files(base_path: str) -> List[Path]:
+    """Every <folder>/<folder>.md under base_path, the layout InitialComparePasser builds paths for"""
+    files = []
+    for folder in sorted(Path(base_path).iterdir()):
+        markdown_file = folder / f"{folder.name}.md"
+        if folder.is_dir() and markdown_file.is_file():
+            files.append(markdown_file)
+    return files
+
+
+def index_markdown_file(file_path: str, cache_dir: Optional[str] = None) -> Tuple[str, Optional[list], Optional[list], Optional[str]]:
+    """Build (or validate) the compiled index of one file in a worker process.
+
+    Returns (file_path, stamp, [[number, title, level], ...], error).
+    """
+    try:
+        index = SectionIndex.load(file_path, cache_dir)
+        if index is None:
+            return file_path, None, None, "no sections could be read"
+        sections = [[s.number, s.title, s.level] for s in index.all_sections]
+        return file_path, index.source_stamp, sections, None
+    except Exception as e:
+        return file_path, None, None, str(e)
+
+
+def load_catalog(catalog_file: Path) -> Dict[str, dict]:
+    try:
+        with open(catalog_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if data.get("version") != CATALOG_VERSION:
+        return {}
+    return data.get("files", {})
+
+
+def save_catalog(catalog_file: Path, files: Dict[str, dict]):
+    tmp_file = catalog_file.with_name(catalog_file.name + ".tmp")
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump({"version": CATALOG_VERSION, "files": files}, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp_file, catalog_file)
+
+
+def build_indexes(base_path: str, cache_dir: Optional[str] = None, catalog_file: Optional[str] = None,
+                  workers: Optional[int] = None, force: bool = False) -> bool:
+    """Index every knowledge-base file under base_path and write the global title catalog"""
+    catalog_path = Path(catalog_file) if catalog_file else Path(base_path) / CATALOG_FILE
+    previous = {} if force else load_catalog(catalog_path)
+
+    markdown_files = find_markdown_files(base_path)
+    catalog: Dict[str, dict] = {}
+    pending = []
+
+    # Incremental: a file whose stamp matches the catalog and whose index still exists is skipped
+    for markdown_file in markdown_files:
+        key = str(markdown_file.relative_to(base_path))
+        entry = previous.get(key)
+        cache_file = SectionIndex.cache_path(markdown_file, cache_dir)
+        if (entry and cache_file.exists()
+                and entry["stamp"] == SectionIndex.file_stamp(markdown_file)):
+            catalog[key] = entry
+        else:
+            if force and cache_file.exists():
+                cache_file.unlink()
+            pending.append(markdown_file)
+
+    print(f"Found {len(markdown_files)} markdown files, {len(pending)} to index")
+
+    failed = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(index_markdown_file, str(f), cache_dir) for f in pending]
+        for future in as_completed(futures):
+            file_path, stamp, sections, error = future.result()
+            if error:
+                failed += 1
+                print(f"Error indexing {file_path}: {error}")
+                continue
+            key = str(Path(file_path).relative_to(base_path))
+            catalog[key] = {"stamp": stamp, "sections": sections}
+            print(f"Indexed {key} ({len(sections)} sections)")
+
+    save_catalog(catalog_path, dict(sorted(catalog.items())))
+    print(f"Title catalog written to {catalog_path}")
+    return failed == 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-build section indexes for the whole knowledge base")
+    parser.add_argument("base_path", nargs="?", default=BASE_PATH, help="knowledge-base root (default: %(default)s)")
+    parser.add_argument("--cache-dir", help="write indexes here instead of next to each markdown file")
+    parser.add_argument("--catalog", help=f"title catalog path (default: <base_path>/{CATALOG_FILE})")
+    parser.add_argument("--reference", default=REFERENCE_FILE, help="reference list to pre-tokenize (default: %(default)s)")
+    parser.add_argument("--workers", type=int, help="worker processes (default: one per CPU)")
+    parser.add_argument("--force", action="store_true", help="rebuild every index even if it is current")
+    args = parser.parse_args()
+
+    if not Path(args.base_path).is_dir():
+        print(f"Error: Directory '{args.base_path}' not found")
+        sys.exit(1)
+
+    start_time = time.time()
+
+    if Path(args.reference).exists():
+        corpus = load_reference_corpus(args.reference)
+        print(f"Reference corpus ready: {len(corpus.lines)} lines from {args.reference}")
+
+    ok = build_indexes(args.base_path, args.cache_dir, args.catalog, args.workers, args.force)
+
+    print(f"\nIndexing finished in {time.time() - start_time:.2f} seconds" + ("" if ok else " with errors"))
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
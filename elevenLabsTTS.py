@@ -0,0 +1,316 @@
+import asyncio
+import contextlib
+import re
+from typing import AsyncIterable, AsyncIterator, Iterator, List, Optional
+
+import aiofiles
+
+from apiClients import async_http_client, http_client
+from apiScheduler import ProviderLimiter, retry_delay
+from audioCache import AudioCache
+from stageTiming import annotate, span
+
+API_BASE = "https://api.elevenlabs.io/v1"
+# Raw 16-bit little-endian mono PCM, which can be played before the response is complete
+PCM_OUTPUT_FORMAT = "pcm_22050"
+PCM_SAMPLE_RATE = 22050
+
+DEFAULT_VOICE_SETTINGS = {
+    "stability": 0.5,
+    "similarity_boost": 0.8,
+    "style": 0.0,
+    "use_speaker_boost": True
+}
+
+
+# Longest piece of text sent in one request when synthesizing in chunks
+MAX_CHUNK_CHARS = 400
+# Shorter sentences are merged with the next one before being sent while streaming
+MIN_STREAM_CHUNK_CHARS = 40
+SENTENCE_END = re.compile(r'(?<=[.!?])\s+|\n\s*\n')
+
+
+class ElevenLabsError(RuntimeError):
+    """Error response from the ElevenLabs API; keeps the status and headers for retry decisions"""
+
+    def __init__(self, status_code: int, message: str, headers=None):
+        super().__init__(f"ElevenLabs API error: {status_code}: {message}")
+        self.status_code = status_code
+        self.headers = headers
+
+
+def build_tts_request(text: str, voice_id: str, api_key: str, model_id: str,
+                      voice_settings: Optional[dict] = None, output_format: Optional[str] = None,
+                      previous_text: Optional[str] = None, next_text: Optional[str] = None) -> dict:
+    """Keyword arguments for an httpx POST to the ElevenLabs /stream endpoint.
+
+    previous_text/next_text give a chunk its neighbours so the intonation carries
+    across chunk boundaries.
+    """
+    request = {
+        "url": f"{API_BASE}/text-to-speech/{voice_id}/stream",
+        "headers": {
+            "Accept": "application/json",
+            "xi-api-key": api_key
+        },
+        "json": {
+            "text": text,
+            "model_id": model_id,
+            "voice_settings": voice_settings or DEFAULT_VOICE_SETTINGS
+        },
+    }
+    if output_format:
+        request["params"] = {"output_format": output_format}
+    if previous_text:
+        request["json"]["previous_text"] = previous_text
+    if next_text:
+        request["json"]["next_text"] = next_text
+    return request
+
+
+def _cache_key(cache: Optional[AudioCache], text: str, voice_id: str, model_id: str, voice_settings: Optional[dict],
+               output_format: Optional[str], previous_text: Optional[str], next_text: Optional[str]) -> Optional[str]:
+    if cache is None:
+        return None
+    return cache.make_key(text, voice_id, model_id, voice_settings or DEFAULT_VOICE_SETTINGS,
+                          output_format, previous_text, next_text)
+
+
+def iter_speech_chunks(text: str, voice_id: str, api_key: str, model_id: str,
+                       voice_settings: Optional[dict] = None, output_format: Optional[str] = PCM_OUTPUT_FORMAT,
+                       chunk_size: int = 4096, previous_text: Optional[str] = None,
+                       next_text: Optional[str] = None, cache: Optional[AudioCache] = None) -> Iterator[bytes]:
+    """Yield audio chunks as ElevenLabs streams them; raises ElevenLabsError on an API error.
+
+    With a cache, a hit yields the stored audio without any request, and a fully
+    received response is stored for next time.
+    """
+    key = _cache_key(cache, text, voice_id, model_id, voice_settings, output_format, previous_text, next_text)
+    cached = cache.get(key) if key else None
+    if cached is not None:
+        yield cached
+        return
+
+    received = []
+    request = build_tts_request(text, voice_id, api_key, model_id, voice_settings, output_format,
+                                previous_text, next_text)
+    with http_client().stream("POST", **request) as response:
+        if not response.is_success:
+            response.read()
+            raise ElevenLabsError(response.status_code, response.text, response.headers)
+        for chunk in response.iter_bytes(chunk_size=chunk_size):
+            if chunk:
+                if key:
+                    received.append(chunk)
+                yield chunk
+
+    if key:
+        cache.put(key, b"".join(received))
+
+
+def split_text_chunks(text: str, max_chars: int = MAX_CHUNK_CHARS) -> List[str]:
+    """Split text at paragraph, then sentence boundaries into pieces of at most max_chars.
+
+    A single sentence longer than max_chars is split between words.
+    """
+    chunks = []
+    for paragraph in re.split(r'\n\s*\n', text):
+        current = ""
+        for sentence in re.split(r'(?<=[.!?])\s+', paragraph.strip()):
+            if not sentence:
+                continue
+            while len(sentence) > max_chars:
+                cut = sentence.rfind(" ", 0, max_chars)
+                cut = cut if cut > 0 else max_chars
+                if current:
+                    chunks.append(current)
+                    current = ""
+                chunks.append(sentence[:cut].strip())
+                sentence = sentence[cut:].strip()
+            if current and len(current) + 1 + len(sentence) > max_chars:
+                chunks.append(current)
+                current = sentence
+            else:
+                current = f"{current} {sentence}" if current else sentence
+        if current:
+            chunks.append(current)
+    return chunks
+
+
+class SentenceBuffer:
+    """Collects streamed text and releases it one complete sentence at a time"""
+
+    def __init__(self, min_chars: int = MIN_STREAM_CHUNK_CHARS, max_chars: int = MAX_CHUNK_CHARS):
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+        self.pending = ""
+
+    def feed(self, text: str) -> List[str]:
+        """Add a text delta; returns the sentences it completed"""
+        self.pending += text
+        ready = []
+        start = 0
+        for match in SENTENCE_END.finditer(self.pending):
+            sentence = self.pending[start:match.start()].strip()
+            if len(sentence) < self.min_chars:
+                continue
+            ready.extend(split_text_chunks(sentence, self.max_chars))
+            start = match.end()
+        self.pending = self.pending[start:]
+        return ready
+
+    def flush(self) -> List[str]:
+        """Return whatever is left once the stream has ended"""
+        rest, self.pending = self.pending.strip(), ""
+        return split_text_chunks(rest, self.max_chars) if rest else []
+
+
+async def async_iter_speech_chunks(text: str, voice_id: str, api_key: str, model_id: str,
+                                   voice_settings: Optional[dict] = None,
+                                   output_format: Optional[str] = PCM_OUTPUT_FORMAT, chunk_size: int = 4096,
+                                   previous_text: Optional[str] = None, next_text: Optional[str] = None,
+                                   cache: Optional[AudioCache] = None,
+                                   limiter: Optional[ProviderLimiter] = None) -> AsyncIterator[bytes]:
+    """Async version of iter_speech_chunks() on the event loop's pooled HTTP client.
+
+    With a limiter the request holds one of its slots while it streams; it is not
+    retried, since part of the audio may already have been played. Cache files are
+    read and written on a worker thread.
+    """
+    key = _cache_key(cache, text, voice_id, model_id, voice_settings, output_format, previous_text, next_text)
+    cached = await asyncio.to_thread(cache.get, key) if key else None
+    if cached is not None:
+        annotate(audio_cache="hit")
+        yield cached
+        return
+
+    received = []
+    request = build_tts_request(text, voice_id, api_key, model_id, voice_settings, output_format,
+                                previous_text, next_text)
+    async with limiter.slot() if limiter else contextlib.nullcontext():
+        async with async_http_client().stream("POST", **request) as response:
+            if not response.is_success:
+                await response.aread()
+                raise ElevenLabsError(response.status_code, response.text, response.headers)
+            async for chunk in response.aiter_bytes(chunk_size=chunk_size):
+                if chunk:
+                    if key:
+                        received.append(chunk)
+                    yield chunk
+
+    if key:
+        await asyncio.to_thread(cache.put, key, b"".join(received))
+
+
+async def async_download_speech(text: str, output_file: str, voice_id: str, api_key: str, model_id: str,
+                                output_format: Optional[str] = None, chunk_size: int = 1024,
+                                cache: Optional[AudioCache] = None, limiter: Optional[ProviderLimiter] = None):
+    """Stream the speech for text straight into output_file without blocking the event loop"""
+    async with aiofiles.open(output_file, "wb") as f:
+        async for chunk in async_iter_speech_chunks(text, voice_id, api_key, model_id, output_format=output_format,
+                                                    chunk_size=chunk_size, cache=cache, limiter=limiter):
+            await f.write(chunk)
+
+
+async def async_synthesize_chunk(text: str, voice_id: str, api_key: str, model_id: str, retries: int = 2,
+                                 previous_text: Optional[str] = None, next_text: Optional[str] = None,
+                                 voice_settings: Optional[dict] = None, cache: Optional[AudioCache] = None,
+                                 limiter: Optional[ProviderLimiter] = None) -> bytes:
+    """Synthesize one chunk to PCM bytes, retrying with jittered exponential backoff on failure.
+
+    With a limiter, the limiter takes over rate limiting and retries.
+    """
+    async def synthesize() -> bytes:
+        with span("tts.chunk", chars=len(text)) as chunk_span:
+            audio = b"".join([chunk async for chunk in async_iter_speech_chunks(
+                text, voice_id, api_key, model_id, voice_settings,
+                previous_text=previous_text, next_text=next_text, cache=cache)])
+            chunk_span.set(bytes=len(audio))
+            return audio
+
+    if limiter:
+        return await limiter.run(synthesize, retries)
+
+    for attempt in range(retries + 1):
+        try:
+            return await synthesize()
+        except Exception as e:
+            if attempt == retries:
+                raise
+            delay = retry_delay(e, attempt)
+            print(f"TTS chunk failed ({e}), retrying in {delay:.1f}s...")
+            await asyncio.sleep(delay)
+
+
+async def async_iter_chunked_speech(text: str, voice_id: str, api_key: str, model_id: str, max_parallel: int = 3,
+                                    max_chars: int = MAX_CHUNK_CHARS, retries: int = 2,
+                                    voice_settings: Optional[dict] = None, cache: Optional[AudioCache] = None,
+                                    limiter: Optional[ProviderLimiter] = None) -> AsyncIterator[bytes]:
+    """Synthesize text as sentence chunks, at most max_parallel at a time, yielding PCM in order.
+
+    Each chunk is yielded as soon as it and every chunk before it are done, so
+    playback of the first chunk overlaps synthesis of the rest.
+    """
+    chunks = split_text_chunks(text, max_chars)
+    limit = asyncio.Semaphore(max(1, max_parallel))
+
+    async def synthesize(i: int) -> bytes:
+        async with limit:
+            return await async_synthesize_chunk(chunks[i], voice_id, api_key, model_id, retries,
+                                                chunks[i - 1] if i else None,
+                                                chunks[i + 1] if i + 1 < len(chunks) else None,
+                                                voice_settings, cache, limiter)
+
+    tasks = [asyncio.ensure_future(synthesize(i)) for i in range(len(chunks))]
+    try:
+        for task in tasks:
+            yield await task
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def async_iter_streamed_speech(texts: AsyncIterable[str], voice_id: str, api_key: str, model_id: str,
+                                     max_parallel: int = 2, retries: int = 2, voice_settings: Optional[dict] = None,
+                                     cache: Optional[AudioCache] = None,
+                                     limiter: Optional[ProviderLimiter] = None) -> AsyncIterator[bytes]:
+    """Synthesize text pieces as they arrive from a (slow) async iterator, yielding PCM in order.
+
+    texts is consumed by its own task, so synthesis of early sentences and playback
+    of their audio overlap with the production of later ones.
+    """
+    limit = asyncio.Semaphore(max(1, max_parallel))
+    pending: "asyncio.Queue[Optional[asyncio.Future]]" = asyncio.Queue()
+
+    async def synthesize(text: str, previous: Optional[str]) -> bytes:
+        async with limit:
+            return await async_synthesize_chunk(text, voice_id, api_key, model_id, retries,
+                                                previous, None, voice_settings, cache, limiter)
+
+    async def produce():
+        previous = None
+        try:
+            async for text in texts:
+                pending.put_nowait(asyncio.ensure_future(synthesize(text, previous)))
+                previous = text
+        finally:
+            pending.put_nowait(None)
+
+    producer = asyncio.ensure_future(produce())
+    tasks = []
+    try:
+        while True:
+            task = await pending.get()
+            if task is None:
+                break
+            tasks.append(task)
+            yield await task
+        await producer
+    finally:
+        producer.cancel()
+        for task in tasks:
+            task.cancel()
+        while not pending.empty():
+            task = pending.get_nowait()
+            if task is not None:
+                task.cancel()
@@ -1,222 +1,529 @@
-import subprocess
-import sys
-import time
-from pathlib import Path
-import anthropic
-import requests
-import pygame
-import asyncio
-import aiofiles
-
-class APIHandler:
-    def __init__(self):
-        self.claude = anthropic.Anthropic(api_key='')
-        self.eleven_labs_key = ''
-        self.voice_id = ""
-        pygame.mixer.init()
-
-    async def process_claude_request(self, input_file: str, sections_file: str, output_file: str, is_section_selection: bool = False) -> bool:
-        """Handle Claude API requests"""
-        try:
-            async with aiofiles.open(input_file, 'r', encoding='utf-8') as f:
-                input_content = await f.read()
-            async with aiofiles.open(sections_file, 'r', encoding='utf-8') as f:
-                sections_content = await f.read()
-
-            combined_content = f"""Input Query:
-{input_content}
-
-Available Sections:
-{sections_content}"""
-
-            system_msg = (
-                "You are to receive the text of the User and decide which topics would be best to query based on the list you receive. "
-                "You will repeat back the numbers corresponding to your decision at hand. Each value is separated by a new line."
-            ) if is_section_selection else (
-                "You are to receive helpful data that is relevant to the goal at hand, which is based on the prompt you receive. "
-                "You will receive a request, and then helpful data to enrich your response."
-            )
-
-            response = await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: self.claude.messages.create(
-                    model="claude-3-haiku-20240307",
-                    max_tokens=512,
-                    system=system_msg,
-                    messages=[{"role": "user", "content": [{"type": "text", "text": combined_content}]}]
-                )
-            )
-
-            async with aiofiles.open(output_file, 'w', encoding='utf-8') as f:
-                await f.write(response.content[0].text)
-            return True
-
-        except Exception as e:
-            print(f"Error in Claude processing: {e}")
-            return False
-
-    async def process_eleven_labs(self, input_file: str, output_file: str = "output.mp3") -> bool:
-        """Handle ElevenLabs API requests and play audio"""
-        try:
-            async with aiofiles.open(input_file, 'r', encoding='utf-8') as f:
-                text = await f.read()
-
-            print("Making ElevenLabs API request...")
-            response = await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: requests.post(
-                    f"https://api.elevenlabs.io/v1/text-to-speech/{self.voice_id}/stream",
-                    headers={
-                        "Accept": "application/json",
-                        "xi-api-key": self.eleven_labs_key
-                    },
-                    json={
-                        "text": text,
-                        "model_id": "eleven_multilingual_v2",
-                        "voice_settings": {
-                            "stability": 0.5,
-                            "similarity_boost": 0.8,
-                            "style": 0.0,
-                            "use_speaker_boost": True
-                        }
-                    },
-                    stream=True
-                )
-            )
-
-            if response.ok:
-                print("Saving audio stream...")
-                with open(output_file, "wb") as f:
-                    for chunk in response.iter_content(chunk_size=1024):
-                        f.write(chunk)
-
-                print("Audio saved, preparing playback...")
-                # Re-initialize pygame mixer
-                pygame.mixer.quit()
-                pygame.mixer.init()
-
-                # Load and play the audio
-                try:
-                    pygame.mixer.music.load(output_file)
-                    pygame.mixer.music.play()
-
-                    print("Playing audio...")
-                    # Wait for playback to complete
-                    while pygame.mixer.music.get_busy():
-                        await asyncio.sleep(0.1)
-
-                    pygame.mixer.music.unload()
-                    print("Audio playback completed.")
-                    return True
-                except Exception as audio_error:
-                    print(f"Error during audio playback: {audio_error}")
-                    return False
-            else:
-                print(f"ElevenLabs API error: {response.status_code}")
-                print(f"Error message: {response.text}")
-                return False
-
-        except Exception as e:
-            print(f"Error in ElevenLabs processing: {e}")
-            return False
-        finally:
-            # Ensure pygame mixer is properly closed
-            pygame.mixer.quit()
-
-def run_script(script_name: str) -> bool:
-    """Run a Python script"""
-    try:
-        print(f"\n{'=' * 50}")
-        print(f"Running {script_name}...")
-        print(f"{'=' * 50}")
-
-        result = subprocess.run([sys.executable, f"{script_name}.py"], check=True)
-        print(f"\nSuccessfully completed {script_name}")
-        return result.returncode == 0
-
-    except Exception as e:
-        print(f"\nError executing {script_name}: {e}")
-        return False
-
-async def main():
-    # Initialize API handler
-    api_handler = APIHandler()
-
-    # Script sequence - no flags needed as scripts handle their own data passing
-    scripts = [
-        "InitialComparePasser",     # Will automatically run mdExtractForPrompt
-        "integerExtract",
-        "compare2PathPasser",       # Will automatically run markdownisoBatch
-    ]
-
-    print("\nStarting script execution sequence...")
-    start_time = time.time()
-
-    for i, script in enumerate(scripts, 1):
-        print(f"\nStep {i}/{len(scripts)}")
-
-        script_path = Path(f"{script}.py")
-        if not script_path.exists():
-            print(f"Error: {script_path} not found")
-            sys.exit(1)
-
-        success = run_script(script)
-
-        if not success:
-            print(f"\nExecution stopped at {script}")
-            sys.exit(1)
-
-        # Add small delay between scripts
-        await asyncio.sleep(1)
-
-    # Handle Claude section selection
-    print("\nProcessing Claude section selection...")
-    success = await api_handler.process_claude_request(
-        "myInput.txt",
-        "Available_sections.txt",
-        "IntegerList.txt",
-        is_section_selection=True
-    )
-    if not success:
-        print("Failed at Claude section selection")
-        sys.exit(1)
-
-    # Handle final Claude response
-    print("\nProcessing final Claude response...")
-    success = await api_handler.process_claude_request(
-        "myInput.txt",
-        "SuggestedHelp.txt",
-        "ClaudeFinal.txt"
-    )
-    if not success:
-        print("Failed at final Claude response")
-        sys.exit(1)
-
-    # Handle ElevenLabs processing
-    print("\nProcessing text-to-speech...")
-    success = await api_handler.process_eleven_labs("ClaudeFinal.txt")
-    if not success:
-        print("Failed at text-to-speech conversion")
-        sys.exit(1)
-
-    await asyncio.sleep(0.5)
-
-    end_time = time.time()
-    duration = end_time - start_time
-
-    print("\n" + "=" * 50)
-    print("Execution Summary:")
-    print("=" * 50)
-    print(f"All steps completed successfully")
-    print(f"Total execution time: {duration:.2f} seconds")
-    print("=" * 50)
-
-if __name__ == "__main__":
-    try:
-        asyncio.run(main())
-    except KeyboardInterrupt:
-        print("\nProcess interrupted by user")
-        sys.exit(1)
-    except Exception as e:
-        print(f"\nFatal error: {e}")
+import argparse
+import contextvars
+import os
+import sys
+import time
+from typing import Dict, Optional
+import asyncio
+import aiofiles
+
+import apiCassette
+import apiClients
+from apiScheduler import DEFAULT_MAX_RETRIES, ProviderLimiter
+from audioStream import PcmStreamPlayer, playback_worker, wait_for_playback
+from batchRunner import DEFAULT_PARALLELISM, run_batch_file
+from audioCache import AudioCache, DEFAULT_CACHE_DIR
+from elevenLabsTTS import (SentenceBuffer, async_download_speech, async_iter_chunked_speech, async_iter_speech_chunks,
+                           async_iter_streamed_speech)
+from InitialComparePasser import BASE_PATH
+from orcServer import PipelineServer
+from pipelineEngine import QueryPipeline
+from responseCache import DEFAULT_DB_PATH, TIMESTAMP_LINE, ResponseCache
+from stageTiming import annotate, finish_span, span, start_span, tracer
+
+# Longest fastORC waits at exit for queued speech to finish playing
+EXIT_PLAYBACK_TIMEOUT = 600.0
+
+class APIHandler:
+    def __init__(self, streaming_audio: bool = False, jitter_buffer_ms: int = 300, tts_parallelism: int = 0,
+                 pipelined_speech: bool = False, audio_cache: Optional[AudioCache] = None,
+                 response_cache: Optional[ResponseCache] = None, prompt_caching: bool = False,
+                 claude_limiter: Optional[ProviderLimiter] = None, tts_limiter: Optional[ProviderLimiter] = None,
+                 headless: bool = False, background_playback: bool = False):
+        self._claude = None
+        self.eleven_labs_key = ''
+        self.voice_id = ""
+        self.tts_model_id = "eleven_multilingual_v2"
+        # Play PCM audio as it downloads instead of waiting for the full MP3
+        self.streaming_audio = streaming_audio
+        self.jitter_buffer_ms = jitter_buffer_ms
+        # When > 0, long answers are synthesized as sentence chunks, this many at a time
+        self.tts_parallelism = tts_parallelism
+        # Speak the final answer sentence by sentence while Claude is still generating it
+        self.pipelined_speech = pipelined_speech
+        # Synthesized audio is reused for identical text/voice/model/settings
+        self.audio_cache = audio_cache
+        # Claude answers are reused for requests that are identical once normalized
+        self.response_cache = response_cache
+        # Mark the system prompt and per-document section catalog as cacheable prompt prefixes
+        self.prompt_caching = prompt_caching
+        # Per-provider concurrency/rate limits; rate-limited and transient failures are retried
+        self.claude_limiter = claude_limiter or ProviderLimiter("Claude")
+        self.tts_limiter = tts_limiter or ProviderLimiter("ElevenLabs")
+        # Request key -> task of an identical Claude request already in flight
+        self._inflight: Dict[str, asyncio.Future] = {}
+        # Never touch the audio device (pygame is not even imported); speech is only saved to files
+        self.headless = headless
+        # Return as soon as speech is queued on the playback worker instead of once it has been played
+        self.background_playback = background_playback
+
+    @property
+    def claude(self):
+        """Async Anthropic client; the shared pooled one unless another was assigned"""
+        return self._claude or apiClients.async_anthropic_client('')
+
+    @claude.setter
+    def claude(self, client):
+        self._claude = client
+
+    @staticmethod
+    def claude_request_args(input_content: str, sections_content: str, is_section_selection: bool = False,
+                            prompt_caching: bool = False) -> dict:
+        """Keyword arguments for claude.messages.create()/stream().
+
+        With prompt_caching the static prefix - system prompt, then the section list
+        or help documentation - is sent ahead of the query and marked cacheable, so
+        repeated questions against the same document reuse the cached prefix.
+        """
+        system_msg = (
+            "You are to receive the text of the User and decide which topics would be best to query based on the list you receive. "
+            "You will repeat back the numbers corresponding to your decision at hand. Each value is separated by a new line."
+        ) if is_section_selection else (
+            "You are to receive helpful data that is relevant to the goal at hand, which is based on the prompt you receive. "
+            "You will receive a request, and then helpful data to enrich your response."
+        )
+
+        if prompt_caching:
+            cache_control = {"type": "ephemeral"}
+            # A per-second timestamp would make every help document a new prefix
+            sections_content = TIMESTAMP_LINE.sub("", sections_content)
+            system = [{"type": "text", "text": system_msg, "cache_control": cache_control}]
+            content = [
+                {"type": "text", "text": f"Available Sections:\n{sections_content}", "cache_control": cache_control},
+                {"type": "text", "text": f"Input Query:\n{input_content}"},
+            ]
+        else:
+            system = system_msg
+            content = [{"type": "text", "text": f"""Input Query:
+{input_content}
+
+Available Sections:
+{sections_content}"""}]
+
+        return {
+            "model": "claude-3-haiku-20240307",
+            "max_tokens": 512,
+            "system": system,
+            "messages": [{"role": "user", "content": content}],
+        }
+
+    @staticmethod
+    def report_prompt_cache(usage):
+        """Print how many input tokens were read from / written to the prompt cache"""
+        read_tokens = getattr(usage, "cache_read_input_tokens", None) or 0
+        written_tokens = getattr(usage, "cache_creation_input_tokens", None) or 0
+        if read_tokens or written_tokens:
+            print(f"Prompt cache: {read_tokens} input tokens read, {written_tokens} written, "
+                  f"{usage.input_tokens} uncached")
+
+    @staticmethod
+    def usage_attributes(usage) -> dict:
+        """Token counts of a response, for its timing span"""
+        attributes = {}
+        for field in ("input_tokens", "output_tokens", "cache_read_input_tokens", "cache_creation_input_tokens"):
+            value = getattr(usage, field, None)
+            if value:
+                attributes[field] = value
+        return attributes
+
+    def cache_key(self, request_args: dict, use_cache: bool = True) -> Optional[str]:
+        """Response-cache key for a request, or None when caching is off for it"""
+        if not use_cache or self.response_cache is None:
+            return None
+        return self.response_cache.make_key(request_args)
+
+    async def request_claude(self, input_content: str, sections_content: str, is_section_selection: bool = False,
+                             use_cache: bool = True) -> Optional[str]:
+        """Send the query and sections to Claude and return the response text.
+
+        A cached response for the same (normalized) request is returned without
+        calling the API, and concurrent identical requests share one API call;
+        pass use_cache=False to always send a request of its own. The cache's SQLite
+        reads and writes run on a worker thread.
+        """
+        try:
+            request_args = self.claude_request_args(input_content, sections_content, is_section_selection,
+                                                    self.prompt_caching)
+            key = self.cache_key(request_args, use_cache)
+            if key:
+                cached = await asyncio.to_thread(self.response_cache.get, key)
+                if cached is not None:
+                    print("Using cached Claude response")
+                    annotate(response_cache="hit")
+                    return cached
+
+            inflight_key = (key or ResponseCache.make_key(request_args)) if use_cache else None
+            shared = self._inflight.get(inflight_key) if inflight_key else None
+            if shared is not None:
+                print("Sharing an identical Claude request already in flight")
+                return await asyncio.shield(shared)
+
+            task = asyncio.ensure_future(self._create_message(request_args))
+            if inflight_key:
+                self._inflight[inflight_key] = task
+                task.add_done_callback(lambda _: self._inflight.pop(inflight_key, None))
+            response_text = await asyncio.shield(task)
+            if key:
+                await asyncio.to_thread(self.response_cache.put, key, response_text)
+            return response_text
+
+        except Exception as e:
+            print(f"Error in Claude processing: {e}")
+            return None
+
+    async def _create_message(self, request_args: dict) -> str:
+        # Retries are left to the limiter so they queue fairly and honor Retry-After
+        client = self.claude.with_options(max_retries=0)
+        with span("claude.request", model=request_args["model"]) as api_span:
+            response = await self.claude_limiter.run(lambda: client.messages.create(**request_args))
+            api_span.set(**self.usage_attributes(response.usage))
+        if self.prompt_caching:
+            self.report_prompt_cache(response.usage)
+        return response.content[0].text
+
+    async def answer_and_speak(self, input_content: str, help_content: str,
+                               output_file: Optional[str] = "output.wav", use_cache: bool = True) -> Optional[str]:
+        """Stream the final Claude answer and speak each sentence as soon as it is complete.
+
+        Generation, synthesis and playback overlap; returns the full answer text.
+        A cached answer is spoken the same way without calling the API.
+        """
+        player = None
+        try:
+            print("Streaming Claude response into text-to-speech...")
+            player = PcmStreamPlayer(self.jitter_buffer_ms, save_path=output_file, headless=self.headless)
+            self.trace_playback(player.future)
+            request_args = self.claude_request_args(input_content, help_content, prompt_caching=self.prompt_caching)
+            key = self.cache_key(request_args, use_cache)
+            cached = await asyncio.to_thread(self.response_cache.get, key) if key else None
+            answer_parts = []
+
+            async def sentences():
+                buffer = SentenceBuffer()
+                if cached is not None:
+                    print("Using cached Claude response")
+                    answer_parts.append(cached)
+                    for sentence in buffer.feed(cached):
+                        yield sentence
+                else:
+                    stream_span = start_span("claude.stream", model=request_args["model"])
+                    try:
+                        async with self.claude_limiter.slot(), self.claude.messages.stream(**request_args) as stream:
+                            async for delta in stream.text_stream:
+                                if not answer_parts:
+                                    stream_span.mark("first_token_seconds")
+                                answer_parts.append(delta)
+                                for sentence in buffer.feed(delta):
+                                    yield sentence
+                            usage = (await stream.get_final_message()).usage
+                            stream_span.set(**self.usage_attributes(usage))
+                            if self.prompt_caching:
+                                self.report_prompt_cache(usage)
+                    finally:
+                        finish_span(stream_span)
+                    if key:
+                        await asyncio.to_thread(self.response_cache.put, key, "".join(answer_parts))
+                for sentence in buffer.flush():
+                    yield sentence
+
+            async for chunk in async_iter_streamed_speech(sentences(), self.voice_id, self.eleven_labs_key,
+                                                          self.tts_model_id, max_parallel=max(2, self.tts_parallelism),
+                                                          cache=self.audio_cache, limiter=self.tts_limiter):
+                player.feed(chunk)
+            player.finish()
+
+            if not await self.wait_for_playback(player.future):
+                return None
+            self.report_audio(output_file)
+            return "".join(answer_parts)
+
+        except Exception as e:
+            print(f"Error in streamed Claude/ElevenLabs processing: {e}")
+            if player:
+                player.abort()
+            return None
+
+    async def process_claude_request(self, input_file: str, sections_file: str, output_file: str, is_section_selection: bool = False,
+                                     use_cache: bool = True) -> bool:
+        """Handle Claude API requests"""
+        try:
+            async with aiofiles.open(input_file, 'r', encoding='utf-8') as f:
+                input_content = await f.read()
+            async with aiofiles.open(sections_file, 'r', encoding='utf-8') as f:
+                sections_content = await f.read()
+        except Exception as e:
+            print(f"Error in Claude processing: {e}")
+            return False
+
+        response_text = await self.request_claude(input_content, sections_content, is_section_selection, use_cache)
+        if response_text is None:
+            return False
+
+        try:
+            async with aiofiles.open(output_file, 'w', encoding='utf-8') as f:
+                await f.write(response_text)
+            return True
+        except Exception as e:
+            print(f"Error in Claude processing: {e}")
+            return False
+
+    async def process_eleven_labs(self, input_file: str, output_file: str = "output.mp3") -> bool:
+        """Handle ElevenLabs API requests and play audio"""
+        try:
+            async with aiofiles.open(input_file, 'r', encoding='utf-8') as f:
+                text = await f.read()
+        except Exception as e:
+            print(f"Error in ElevenLabs processing: {e}")
+            return False
+
+        return await self.speak_text(text, output_file)
+
+    async def speak_text(self, text: str, output_file: Optional[str] = None) -> bool:
+        """Convert text to speech with ElevenLabs and play the audio"""
+        if self.streaming_audio or self.tts_parallelism:
+            return await self.stream_text(text, output_file or "output.wav")
+        output_file = output_file or "output.mp3"
+
+        try:
+            print("Making ElevenLabs API request...")
+
+            with span("tts.download", chars=len(text)) as download_span:
+                await async_download_speech(text, output_file, self.voice_id, self.eleven_labs_key, self.tts_model_id,
+                                            cache=self.audio_cache, limiter=self.tts_limiter)
+                download_span.set(bytes=os.path.getsize(output_file))
+        except Exception as e:
+            print(f"Error in ElevenLabs processing: {e}")
+            return False
+
+        if self.headless:
+            self.report_audio(output_file)
+            return True
+
+        try:
+            played = playback_worker().play_file(output_file)
+        except Exception as e:
+            print(f"Error during audio playback: {e}")
+            return False
+        self.trace_playback(played)
+        if not await self.wait_for_playback(played):
+            return False
+        self.report_audio(output_file)
+        return True
+
+    @staticmethod
+    def trace_playback(played):
+        """Time a queued clip with an audio.playback span that ends once it has been played.
+
+        The clip completes on the playback thread; the span is finished back on the
+        event loop, in the context of the query that queued it.
+        """
+        playback_span = start_span("audio.playback")
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+
+        def finish(_):
+            try:
+                loop.call_soon_threadsafe(finish_span, playback_span, context=context)
+            except RuntimeError:  # the loop is already closed
+                finish_span(playback_span)
+
+        played.add_done_callback(finish)
+
+    async def wait_for_playback(self, played) -> bool:
+        """Wait until a queued clip has been played, unless playback runs in the background"""
+        if self.background_playback and not played.done():
+            return True
+        return await asyncio.wrap_future(played)
+
+    def report_audio(self, output_file: Optional[str]):
+        if self.background_playback and not self.headless:
+            print("Audio queued for playback.")
+        elif not self.headless:
+            print("Audio playback completed.")
+        elif output_file:
+            print(f"Audio saved to {output_file} (headless, not played)")
+
+    async def stream_text(self, text: str, output_file: Optional[str] = "output.wav") -> bool:
+        """Play the speech while it downloads, saving it to output_file (WAV) alongside.
+
+        With tts_parallelism set, the text is synthesized as concurrent sentence chunks
+        that are played back in order as each one completes.
+        """
+        player = None
+        try:
+            print("Streaming ElevenLabs audio...")
+            player = PcmStreamPlayer(self.jitter_buffer_ms, save_path=output_file, headless=self.headless)
+            self.trace_playback(player.future)
+
+            if self.tts_parallelism:
+                chunks = async_iter_chunked_speech(text, self.voice_id, self.eleven_labs_key, self.tts_model_id,
+                                                   max_parallel=self.tts_parallelism, cache=self.audio_cache,
+                                                   limiter=self.tts_limiter)
+            else:
+                chunks = async_iter_speech_chunks(text, self.voice_id, self.eleven_labs_key, self.tts_model_id,
+                                                  cache=self.audio_cache, limiter=self.tts_limiter)
+            with span("tts.download", chars=len(text)) as download_span:
+                async for chunk in chunks:
+                    download_span.add("bytes", len(chunk))
+                    player.feed(chunk)
+            player.finish()
+
+            if not await self.wait_for_playback(player.future):
+                return False
+            self.report_audio(output_file)
+            return True
+
+        except Exception as e:
+            print(f"Error in ElevenLabs streaming: {e}")
+            if player:
+                player.abort()
+            return False
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Answer the query in myInput.txt, a batch of queries, or serve queries over HTTP")
+    parser.add_argument("--debug", action="store_true",
+                        help="dump each stage's output to the legacy handoff files in the CWD")
+    parser.add_argument("--mmap", action="store_true",
+                        help="memory-map knowledge-base files and extract sections without copying them")
+    parser.add_argument("--index-cache-dir", metavar="DIR",
+                        help="where compiled section indexes live (default: next to each markdown file)")
+    parser.add_argument("--stream-audio", action="store_true",
+                        help="start playing the answer while the audio is still downloading")
+    parser.add_argument("--jitter-ms", type=int, default=300,
+                        help="audio buffered before streamed playback starts (default: 300)")
+    parser.add_argument("--tts-parallel", type=int, default=0, metavar="N",
+                        help="synthesize the answer as sentence chunks, N at a time, played in order")
+    parser.add_argument("--pipelined-speech", action="store_true",
+                        help="speak the final answer sentence by sentence while Claude is still writing it")
+    parser.add_argument("--tts-cache-dir", default=DEFAULT_CACHE_DIR, metavar="DIR",
+                        help="where synthesized audio is cached (default: %(default)s)")
+    parser.add_argument("--tts-cache-mb", type=int, default=200,
+                        help="size limit of the audio cache in MB (default: 200)")
+    parser.add_argument("--headless", action="store_true",
+                        help="never use the audio device; speech is only saved (output.mp3 / output.wav)")
+    parser.add_argument("--background-playback", action="store_true",
+                        help="go on with the next step/query while an answer is still being played")
+    parser.add_argument("--no-tts-cache", action="store_true", help="always synthesize audio from scratch")
+    parser.add_argument("--claude-cache", default=DEFAULT_DB_PATH, metavar="FILE",
+                        help="SQLite file caching Claude responses (default: %(default)s)")
+    parser.add_argument("--claude-cache-ttl", type=float, default=24 * 7, metavar="HOURS",
+                        help="how long a cached Claude response stays valid (default: 168)")
+    parser.add_argument("--claude-cache-entries", type=int, default=5000,
+                        help="Claude responses kept in the cache (default: 5000)")
+    parser.add_argument("--no-claude-cache", action="store_true", help="always send Claude requests to the API")
+    parser.add_argument("--prompt-cache", action="store_true",
+                        help="let the API cache the system prompt and section/help text between queries")
+    parser.add_argument("--http-connections", type=int, default=apiClients.DEFAULT_MAX_CONNECTIONS,
+                        help="pooled connections per API client (default: %(default)s)")
+    parser.add_argument("--http-timeout", type=float, default=apiClients.DEFAULT_TIMEOUT,
+                        help="API request timeout in seconds (default: %(default)s)")
+    parser.add_argument("--claude-concurrency", type=int, default=4,
+                        help="Claude requests in flight at once, across all queries (default: 4)")
+    parser.add_argument("--claude-rpm", type=float, default=50,
+                        help="Claude requests per minute, 0 for no limit (default: 50)")
+    parser.add_argument("--tts-concurrency", type=int, default=4,
+                        help="ElevenLabs requests in flight at once, across all queries (default: 4)")
+    parser.add_argument("--tts-rpm", type=float, default=0,
+                        help="ElevenLabs requests per minute, 0 for no limit (default: 0)")
+    parser.add_argument("--api-retries", type=int, default=DEFAULT_MAX_RETRIES,
+                        help="retries of rate-limited or failed API calls (default: %(default)s)")
+    parser.add_argument("--batch", metavar="FILE",
+                        help="answer every query in FILE (JSONL with a \"query\" field, or one query per line)")
+    parser.add_argument("--out", default="batch_results.jsonl", metavar="FILE",
+                        help="where --batch writes its JSONL results (default: %(default)s)")
+    parser.add_argument("--parallel", type=int, default=DEFAULT_PARALLELISM,
+                        help="queries a batch runs at the same time (default: %(default)s)")
+    apiCassette.add_arguments(parser)
+    parser.add_argument("--trace", metavar="FILE",
+                        help="append a JSON line per timed span (stages, API calls, audio) to FILE")
+    parser.add_argument("--serve", nargs="?", const="127.0.0.1:8765", metavar="HOST:PORT",
+                        help="run as a long-lived server instead of answering myInput.txt once")
+    parser.add_argument("--socket", metavar="PATH", help="serve on a Unix socket instead of TCP")
+    parser.add_argument("--max-concurrency", type=int, default=16,
+                        help="queries the server runs at the same time (default: 16)")
+    return parser.parse_args(argv)
+
+async def serve(pipeline: QueryPipeline, args):
+    host, _, port = (args.serve or "127.0.0.1:8765").rpartition(":")
+    server = PipelineServer(pipeline, max_concurrency=args.max_concurrency)
+    try:
+        await server.serve(host or "127.0.0.1", int(port), unix_socket=args.socket)
+    finally:
+        await apiClients.close_async_clients()
+
+async def main(args):
+    # Initialize API handler and the in-process pipeline
+    if args.trace:
+        tracer.set_output(args.trace)
+    apiClients.configure(max_connections=args.http_connections, max_keepalive=args.http_connections,
+                         timeout=args.http_timeout, cassette=apiCassette.from_arguments(args))
+    audio_cache = None if args.no_tts_cache else AudioCache(args.tts_cache_dir, args.tts_cache_mb * 1024 * 1024)
+    response_cache = None if args.no_claude_cache else ResponseCache(
+        args.claude_cache, args.claude_cache_ttl * 3600, args.claude_cache_entries)
+    api_handler = APIHandler(streaming_audio=args.stream_audio, jitter_buffer_ms=args.jitter_ms,
+                             tts_parallelism=args.tts_parallel, pipelined_speech=args.pipelined_speech,
+                             audio_cache=audio_cache, response_cache=response_cache,
+                             prompt_caching=args.prompt_cache,
+                             claude_limiter=ProviderLimiter("Claude", args.claude_concurrency, args.claude_rpm,
+                                                            args.api_retries),
+                             tts_limiter=ProviderLimiter("ElevenLabs", args.tts_concurrency, args.tts_rpm,
+                                                         args.api_retries),
+                             headless=args.headless, background_playback=args.background_playback)
+    debug_dir = "." if args.debug and not (args.serve or args.socket or args.batch) else None
+    pipeline = QueryPipeline(api_handler, BASE_PATH, debug_dir=debug_dir,
+                             index_cache_dir=args.index_cache_dir, use_mmap=args.mmap)
+
+    if args.serve or args.socket:
+        await serve(pipeline, args)
+        return
+
+    if args.batch:
+        try:
+            failed = await run_batch_file(pipeline, args.batch, args.out, args.parallel)
+        finally:
+            await apiClients.close_async_clients()
+        if failed != 0:
+            sys.exit(1)
+        return
+
+    try:
+        with open("myInput.txt", 'r', encoding='utf-8') as f:
+            query = f.read().strip()
+    except Exception as e:
+        print(f"Error reading search query: {e}")
+        sys.exit(1)
+
+    print("\nStarting pipeline execution...")
+    start_time = time.time()
+
+    try:
+        ctx = await pipeline.run(query)
+    finally:
+        await apiClients.close_async_clients()
+    if ctx.error:
+        sys.exit(1)
+
+    end_time = time.time()
+    duration = end_time - start_time
+
+    print("\n" + "=" * 50)
+    print("Execution Summary:")
+    print("=" * 50)
+    print(f"All steps completed successfully")
+    for description, seconds in ctx.timings.items():
+        print(f"  {description}: {seconds:.3f} seconds")
+    print(f"Total execution time: {duration:.2f} seconds")
+    print("=" * 50)
+    # With --background-playback the answer may still be playing
+    if not await asyncio.to_thread(wait_for_playback, EXIT_PLAYBACK_TIMEOUT):
+        print("Gave up waiting for audio playback to finish")
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main(parse_args()))
+    except KeyboardInterrupt:
+        print("\nProcess interrupted by user")
+        sys.exit(1)
+    except Exception as e:
+        print(f"\nFatal error: {e}")
         sys.exit(1)
\ No newline at end of file
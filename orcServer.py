@@ -0,0 +1,151 @@
+import asyncio
+import json
+from typing import Optional, Tuple
+
+import apiClients
+from pipelineEngine import QueryPipeline
+from stageTiming import span, tracer
+
+STATUS_TEXT = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+               413: "Payload Too Large", 500: "Internal Server Error"}
+MAX_BODY_BYTES = 1024 * 1024
+
+
+class PipelineServer:
+    """Long-lived HTTP endpoint that answers queries with one shared QueryPipeline.
+
+    POST /query with a JSON body {"query": "...", "speak": false} runs the pipeline
+    and returns the answer as JSON; GET /health reports liveness and GET /metrics the
+    per-stage latency aggregates of the process tracer. Every connection is
+    handled on the same event loop, so the Anthropic client and the cached
+    reference and markdown indexes stay warm across requests.
+    """
+
+    def __init__(self, pipeline: QueryPipeline, max_concurrency: int = 16):
+        self.pipeline = pipeline
+        self.query_slots = asyncio.Semaphore(max_concurrency)
+        # Answers are synthesized one at a time so their audio is queued for playback in order
+        self.speech_lock = asyncio.Lock()
+        self.queries_served = 0
+
+    async def answer_query(self, query: str, speak: bool = False) -> dict:
+        """Run one query through the pipeline and return the JSON response body"""
+        async with self.query_slots:
+            ctx = await self.pipeline.run(query, speak=False)
+            if speak and not ctx.error:
+                async with self.speech_lock:
+                    with span("Text-to-speech", query=query) as speech_span:
+                        spoken = await self.pipeline.speak(ctx)
+                    ctx.timings["Text-to-speech"] = speech_span.duration
+                    if not spoken:
+                        ctx.error = "Failed at text-to-speech"
+
+        self.queries_served += 1
+        return {
+            "query": ctx.query,
+            "markdown_path": ctx.markdown_path,
+            "section_numbers": ctx.section_numbers,
+            "answer": ctx.answer_text,
+            "error": ctx.error,
+            "timings": {stage: round(seconds, 4) for stage, seconds in ctx.timings.items()},
+        }
+
+    async def read_request(self, reader: asyncio.StreamReader) -> Optional[Tuple[str, str, dict, bytes]]:
+        """Read one HTTP/1.1 request; returns None when the client closed the connection"""
+        request_line = await reader.readline()
+        if not request_line:
+            return None
+        method, path, _ = request_line.decode('latin-1').split(" ", 2)
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode('latin-1').partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        length = int(headers.get("content-length", 0))
+        if length > MAX_BODY_BYTES:
+            raise ValueError("payload too large")
+        body = await reader.readexactly(length) if length else b""
+        return method, path, headers, body
+
+    async def route(self, method: str, path: str, body: bytes) -> Tuple[int, dict]:
+        if path == "/health":
+            return 200, {"status": "ok", "queries_served": self.queries_served}
+        if path == "/metrics":
+            return 200, {"queries_served": self.queries_served, "spans": tracer.metrics()}
+        if path != "/query":
+            return 404, {"error": f"Unknown path {path}"}
+        if method != "POST":
+            return 405, {"error": "Use POST /query"}
+
+        try:
+            payload = json.loads(body or b"{}")
+            if not isinstance(payload, dict):
+                raise ValueError("body is not a JSON object")
+            query = payload["query"].strip()
+        except (ValueError, KeyError, AttributeError):
+            return 400, {"error": 'Body must be JSON like {"query": "..."}'}
+        if not query:
+            return 400, {"error": "Empty query"}
+
+        result = await self.answer_query(query, bool(payload.get("speak", False)))
+        return 200, result
+
+    @staticmethod
+    def write_response(writer: asyncio.StreamWriter, status: int, body: dict, keep_alive: bool):
+        data = json.dumps(body).encode('utf-8')
+        head = (
+            f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(data)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode('latin-1') + data)
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serve requests on one connection until the client closes it"""
+        try:
+            while True:
+                try:
+                    request = await self.read_request(reader)
+                except (ValueError, asyncio.IncompleteReadError) as e:
+                    status = 413 if "too large" in str(e) else 400
+                    self.write_response(writer, status, {"error": f"Malformed request: {e}"}, False)
+                    await writer.drain()
+                    break
+                if request is None:
+                    break
+
+                method, path, headers, body = request
+                keep_alive = headers.get("connection", "").lower() != "close"
+                try:
+                    status, response = await self.route(method, path, body)
+                except Exception as e:
+                    print(f"Error handling {method} {path}: {e}")
+                    status, response = 500, {"error": str(e)}
+
+                self.write_response(writer, status, response, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 8765, unix_socket: Optional[str] = None):
+        """Serve until cancelled, on a TCP port or on a Unix socket"""
+        # The SDK import takes seconds; done here, it neither delays nor blocks the first request
+        await asyncio.to_thread(apiClients.sdk)
+        if unix_socket:
+            server = await asyncio.start_unix_server(self.handle_connection, path=unix_socket)
+            print(f"Serving queries on unix socket {unix_socket}")
+        else:
+            server = await asyncio.start_server(self.handle_connection, host, port)
+            print(f"Serving queries on http://{host}:{port}/query")
+
+        async with server:
+            await server.serve_forever()
@@ -0,0 +1,298 @@
+import asyncio
+import contextlib
+import inspect
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional
+
+from apiScheduler import current_query
+from InitialComparePasser import BASE_PATH, MIN_SIMILARITY, REFERENCE_FILE, find_markdown_path, find_markdown_paths
+from integerExtract import parse_hierarchical_numbers
+from markdownisoBatch import MarkdownBatchExtractor
+from mdExtractForPrompt import list_available_sections
+from sectionIndex import SectionIndex
+from stageTiming import annotate, span
+
+# Markdown files whose parsed values stay warm; the least recently used file goes first
+MAX_CACHED_MARKDOWN = 32
+
+
+class RequestContext:
+    """Everything one query produces on its way through the pipeline"""
+
+    # Attribute -> file name used by the standalone scripts, for debug dumps
+    DUMP_FILES = {
+        "query": "myInput.txt",
+        "sections_text": "Available_sections.txt",
+        "selection_text": "IntegerList.txt",
+        "section_numbers": "intgOUT.txt",
+        "help_text": "SuggestedHelp.txt",
+        "answer_text": "ClaudeFinal.txt",
+    }
+
+    def __init__(self, query: str):
+        self.query = query
+        self.markdown_path: Optional[str] = None
+        # Set when markdown_path was already looked up (e.g. by QueryPipeline.match_batch)
+        self.matched = False
+        self.sections_text: Optional[str] = None
+        self.selection_text: Optional[str] = None
+        self.section_numbers: List[str] = []
+        self.help_text: Optional[str] = None
+        self.answer_text: Optional[str] = None
+        self.error: Optional[str] = None
+        # Stage description -> seconds it took, in the order the stages ran
+        self.timings: Dict[str, float] = {}
+
+    def dump(self, directory: str):
+        """Write every populated field to the file the standalone scripts would use"""
+        out_dir = Path(directory)
+        try:
+            out_dir.mkdir(parents=True, exist_ok=True)
+            for attr, file_name in self.DUMP_FILES.items():
+                value = getattr(self, attr)
+                if not value:
+                    continue
+                if isinstance(value, list):
+                    value = "".join(f"{item}\n" for item in value)
+                (out_dir / file_name).write_text(value, encoding='utf-8')
+        except Exception as e:
+            print(f"Error writing debug dump to {out_dir}: {e}")
+
+
+class MarkdownEntry:
+    """What the pipeline parsed from one version of a markdown file: its index, section list and extractor.
+
+    Queries hold the entry while they read from it. Once it is evicted or its file
+    changes, the section index (and its memory map) is closed as soon as the last
+    of those queries lets go.
+    """
+
+    def __init__(self, path: str, mtime: Optional[int]):
+        self.path = path
+        self.mtime = mtime
+        self.values: Dict[str, object] = {}
+        # Reentrant, since building the extractor needs the index of the same entry
+        self.build_lock = threading.RLock()
+        self.users = 0
+        self.evicted = False
+        self.closed = False
+
+    def get(self, kind: str, build: Callable[[], Optional[object]]):
+        """Return the value of this kind, building it once; failed (None) builds are retried next time"""
+        with self.build_lock:
+            value = self.values.get(kind)
+            if value is None:
+                value = build()
+                if value is not None:
+                    self.values[kind] = value
+            return value
+
+    def close(self):
+        for value in self.values.values():
+            if isinstance(value, SectionIndex):
+                value.close()
+
+
+class QueryPipeline:
+    """Runs every stage of a query inside the current process.
+
+    Each stage takes the RequestContext, fills in its part and returns whether it
+    succeeded, so one warm process (and one APIHandler) can answer many queries end
+    to end without any intermediate files. Pass debug_dir to dump the context to
+    the legacy handoff files after each run. Synchronous stages (matching, parsing,
+    extraction) run in worker threads so concurrent queries on the same event loop
+    keep making progress.
+    """
+
+    def __init__(self, api_handler, base_path: str = BASE_PATH, reference_file: str = REFERENCE_FILE,
+                 min_similarity: float = MIN_SIMILARITY, debug_dir: Optional[str] = None,
+                 index_cache_dir: Optional[str] = None, use_mmap: bool = False):
+        self.api_handler = api_handler
+        self.base_path = base_path
+        self.reference_file = reference_file
+        self.min_similarity = min_similarity
+        self.debug_dir = debug_dir
+        # Where compiled section indexes go; None keeps them next to each markdown file
+        self.index_cache_dir = index_cache_dir
+        # Slice selected sections out of memory-mapped files instead of seeking per read
+        self.use_mmap = use_mmap
+        # Markdown path -> entry for its current version, least recently used first
+        self._markdown_cache: "OrderedDict[str, MarkdownEntry]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def _markdown(self, path: str) -> Iterator[MarkdownEntry]:
+        """The cache entry for the current version of path, kept open until the block ends"""
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            mtime = None
+
+        with self._cache_lock:
+            entry = self._markdown_cache.get(path)
+            retired = []
+            if entry is None or entry.mtime != mtime:
+                if entry is not None:
+                    retired.append(self._markdown_cache.pop(path))
+                entry = MarkdownEntry(path, mtime)
+                if mtime is None:
+                    entry.evicted = True  # nothing to check it against later, so it is used once
+                else:
+                    self._markdown_cache[path] = entry
+            if not entry.evicted:
+                self._markdown_cache.move_to_end(path)
+            while len(self._markdown_cache) > MAX_CACHED_MARKDOWN:
+                retired.append(self._markdown_cache.popitem(last=False)[1])
+            entry.users += 1
+            to_close = self._retire(retired)
+
+        try:
+            for old in to_close:
+                old.close()
+            yield entry
+        finally:
+            with self._cache_lock:
+                entry.users -= 1
+                to_close = self._retire([entry] if entry.evicted else [])
+            for old in to_close:
+                old.close()
+
+    @staticmethod
+    def _retire(entries: List[MarkdownEntry]) -> List[MarkdownEntry]:
+        """Mark entries evicted; returns those no query is using, to be closed. Call under _cache_lock."""
+        to_close = []
+        for entry in entries:
+            entry.evicted = True
+            if entry.users == 0 and not entry.closed:
+                entry.closed = True
+                to_close.append(entry)
+        return to_close
+
+    def _section_index(self, entry: MarkdownEntry) -> Optional[SectionIndex]:
+        """The parsed section tree shared by the listing and extraction stages"""
+        return entry.get("index", lambda: SectionIndex.load(entry.path, self.index_cache_dir, self.use_mmap))
+
+    def _load_batch_extractor(self, entry: MarkdownEntry) -> Optional[MarkdownBatchExtractor]:
+        extractor = MarkdownBatchExtractor(entry.path, self._section_index(entry))
+        if not extractor.extract_sections():
+            print("Failed to extract sections from file")
+            return None
+        extractor.build_section_map()
+        return extractor
+
+    def match_batch(self, queries: List[str]) -> List[RequestContext]:
+        """Match many queries against the reference file in one pass; hand each context to run()"""
+        with span("Batch reference matching", queries=len(queries)):
+            paths = find_markdown_paths(queries, self.reference_file, self.base_path, self.min_similarity)
+        contexts = []
+        for query, markdown_path in zip(queries, paths):
+            ctx = RequestContext(query)
+            ctx.markdown_path = markdown_path
+            ctx.matched = True
+            contexts.append(ctx)
+        return contexts
+
+    def match_reference(self, ctx: RequestContext) -> bool:
+        """Find the knowledge-base markdown file that best matches the query"""
+        if not ctx.matched:
+            ctx.markdown_path = find_markdown_path(ctx.query, self.reference_file, self.base_path, self.min_similarity)
+            ctx.matched = True
+        annotate(markdown_path=ctx.markdown_path)
+        return ctx.markdown_path is not None
+
+    def list_sections(self, ctx: RequestContext) -> bool:
+        """Build the numbered section list of the matched markdown file"""
+        with self._markdown(ctx.markdown_path) as entry:
+            ctx.sections_text = entry.get("sections",
+                                          lambda: list_available_sections(entry.path, self._section_index(entry)))
+        annotate(bytes=len(ctx.sections_text or ""))
+        return ctx.sections_text is not None
+
+    async def select_sections(self, ctx: RequestContext) -> bool:
+        """Ask Claude which sections are relevant to the query"""
+        ctx.selection_text = await self.api_handler.request_claude(ctx.query, ctx.sections_text, is_section_selection=True)
+        return ctx.selection_text is not None
+
+    def extract_numbers(self, ctx: RequestContext) -> bool:
+        """Pull the hierarchical section numbers out of Claude's selection"""
+        ctx.section_numbers = parse_hierarchical_numbers(ctx.selection_text)
+        annotate(sections=len(ctx.section_numbers))
+        if not ctx.section_numbers:
+            print("No section numbers found in Claude's selection")
+            return False
+        return True
+
+    def build_help(self, ctx: RequestContext) -> bool:
+        """Assemble the help documentation for the selected sections"""
+        with self._markdown(ctx.markdown_path) as entry:
+            extractor = entry.get("batch", lambda: self._load_batch_extractor(entry))
+            if extractor is None:
+                return False
+            ctx.help_text = extractor.build_help_document(ctx.section_numbers)
+        annotate(sections=len(ctx.section_numbers), bytes=len(ctx.help_text))
+        return True
+
+    async def answer(self, ctx: RequestContext) -> bool:
+        """Ask Claude for the final answer enriched with the help documentation"""
+        ctx.answer_text = await self.api_handler.request_claude(ctx.query, ctx.help_text)
+        return ctx.answer_text is not None
+
+    async def answer_and_speak(self, ctx: RequestContext) -> bool:
+        """Stream the final answer from Claude and speak it while it is being generated"""
+        ctx.answer_text = await self.api_handler.answer_and_speak(ctx.query, ctx.help_text)
+        return ctx.answer_text is not None
+
+    async def speak(self, ctx: RequestContext) -> bool:
+        """Convert the final answer to speech and play it"""
+        return await self.api_handler.speak_text(ctx.answer_text)
+
+    def stages(self, speak: bool = True):
+        """Return the (description, stage) pairs for one run"""
+        stages = [
+            ("Reference matching", self.match_reference),
+            ("Section listing", self.list_sections),
+            ("Claude section selection", self.select_sections),
+            ("Section number extraction", self.extract_numbers),
+            ("Section extraction", self.build_help),
+        ]
+        if speak and getattr(self.api_handler, "pipelined_speech", False):
+            stages.append(("Final Claude response with speech", self.answer_and_speak))
+        elif speak:
+            stages.append(("Final Claude response", self.answer))
+            stages.append(("Text-to-speech", self.speak))
+        else:
+            stages.append(("Final Claude response", self.answer))
+        return stages
+
+    async def run(self, query: str, speak: bool = True, ctx: Optional[RequestContext] = None) -> RequestContext:
+        """Run the whole pipeline for one query; ctx.error is set if a stage failed.
+
+        Pass a context from match_batch() to reuse its reference match.
+        """
+        ctx = ctx or RequestContext(query)
+        stages = self.stages(speak)
+        # API calls made from here on queue fairly against those of other queries
+        current_query.set(id(ctx))
+
+        with span("query", query=query) as query_span:
+            for i, (description, stage) in enumerate(stages, 1):
+                print(f"\nStep {i}/{len(stages)}: {description}...")
+                with span(description) as stage_span:
+                    if inspect.iscoroutinefunction(stage):
+                        result = await stage(ctx)
+                    else:
+                        # Off the event loop; the thread inherits the context, so spans still nest
+                        result = await asyncio.to_thread(stage, ctx)
+                ctx.timings[description] = stage_span.duration
+                if not result:
+                    ctx.error = f"Failed at {description.lower()}"
+                    query_span.set(failed_stage=description)
+                    print(ctx.error)
+                    break
+
+        if self.debug_dir:
+            ctx.dump(self.debug_dir)
+        return ctx
@@ -0,0 +1,97 @@
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+DEFAULT_DB_PATH = "claude_cache.sqlite3"
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+DEFAULT_MAX_ENTRIES = 5000
+
+# The help documentation carries a generation timestamp that must not defeat the cache
+TIMESTAMP_LINE = re.compile(r'^Generated on: .*$', re.MULTILINE)
+WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_text(text: str) -> str:
+    """Text as it counts for cache lookups: no timestamp line, whitespace runs collapsed"""
+    return WHITESPACE.sub(' ', TIMESTAMP_LINE.sub('', text)).strip()
+
+
+def normalize_value(value):
+    """normalize_text applied to every string inside nested lists/dicts"""
+    if isinstance(value, str):
+        return normalize_text(value)
+    if isinstance(value, list):
+        return [normalize_value(item) for item in value]
+    if isinstance(value, dict):
+        return {key: normalize_value(item) for key, item in value.items()}
+    return value
+
+
+class ResponseCache:
+    """Persistent SQLite cache of Claude responses.
+
+    Keys are a hash of the canonical, normalized request (model, system prompt,
+    max_tokens and message content), so repeated or whitespace-only-different
+    queries are answered without an API call. Entries expire after ttl_seconds and
+    the least recently used ones are dropped beyond max_entries.
+    """
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH, ttl_seconds: float = DEFAULT_TTL_SECONDS,
+                 max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.db = sqlite3.connect(db_path, check_same_thread=False)
+        with self.lock, self.db:
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, created REAL NOT NULL, last_used REAL NOT NULL)"
+            )
+            self.db.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+
+    @staticmethod
+    def make_key(request_args: dict) -> str:
+        """Canonical hash of the parts of a messages request that determine the answer"""
+        canonical = json.dumps({
+            "model": request_args.get("model"),
+            "system": normalize_value(request_args.get("system")),
+            "max_tokens": request_args.get("max_tokens"),
+            "messages": normalize_value(request_args.get("messages")),
+        }, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response text, or None if missing or expired"""
+        now = time.time()
+        with self.lock, self.db:
+            row = self.db.execute("SELECT response, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None or now - row[1] > self.ttl_seconds:
+                if row is not None:
+                    self.db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.misses += 1
+                return None
+            self.db.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+        self.hits += 1
+        return row[0]
+
+    def put(self, key: str, response: str):
+        """Store a response and trim expired and least recently used entries"""
+        now = time.time()
+        with self.lock, self.db:
+            self.db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)", (key, response, now, now))
+            self.db.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl_seconds,))
+            self.db.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+
+    def close(self):
+        with self.lock:
+            self.db.close()
@@ -0,0 +1,309 @@
+import codecs
+import hashlib
+import json
+import mmap
+import os
+import re
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, TextIO
+
+# Sections are separated by a line holding only "---"; matched on raw bytes so
+# offsets stay valid for files with Windows line endings
+SECTION_SEPARATOR = re.compile(rb'(?:\r\n|\r|\n)---(?:\r\n|\r|\n)')
+HEADER_PATTERN = re.compile(r'^(#{1,6})\s+(.+?)(?:\n|$)')
+INDEX_CACHE_VERSION = 1
+INDEX_CACHE_SUFFIX = ".sections.json"
+# Bytes decoded at a time when streaming a section to an output
+READ_BLOCK_SIZE = 1024 * 1024
+
+
+class MarkdownSection:
+    def __init__(self, title: str, level: int, content: Optional[str] = None, start: int = 0, end: int = 0,
+                 source: Optional['SectionIndex'] = None):
+        self.title = title
+        self.level = level
+        self._content = content
+        # Byte offsets of the (stripped) section text in the source file
+        self.start = start
+        self.end = end
+        # Index whose file the content is read from when it was not given up front
+        self.source = source
+        self.number = ""
+        self.subsections: List[MarkdownSection] = []
+        self.parent: Optional[MarkdownSection] = None
+
+    @property
+    def content(self) -> str:
+        if self._content is not None:
+            return self._content
+        return self.source.read_range(self.start, self.end)
+
+    def write_content(self, f: TextIO):
+        """Write the section text to f without building it as one string"""
+        if self._content is not None:
+            f.write(self._content)
+        else:
+            self.source.write_range(self.start, self.end, f)
+
+
+def normalize_newlines(text: str) -> str:
+    """Translate newlines the way open(..., 'r') does"""
+    return text.replace('\r\n', '\n').replace('\r', '\n')
+
+
+class SectionIndex:
+    """A markdown file parsed once into a numbered section tree.
+
+    Both the "list sections" stage (mdExtractForPrompt) and the "extract selected
+    sections" stage (markdownisoBatch) consume the same index, so a file is only
+    parsed once per change instead of once per stage.
+    """
+
+    def __init__(self, file_path: str, use_mmap: bool = False):
+        self.file_path = Path(file_path)
+        # With use_mmap, section text is sliced from a read-only map of the file that stays
+        # open for the life of the index; otherwise each read opens the file and seeks
+        self.use_mmap = use_mmap
+        self._mmap: Optional[mmap.mmap] = None
+        self._closed = False
+        # (mtime_ns, size) of the file this index was built from
+        self.source_stamp: Optional[List[int]] = None
+        self.root_sections: List[MarkdownSection] = []
+        self.all_sections: List[MarkdownSection] = []
+        self.section_map: Dict[str, MarkdownSection] = {}
+
+    @staticmethod
+    def file_stamp(file_path) -> List[int]:
+        stat = os.stat(file_path)
+        return [stat.st_mtime_ns, stat.st_size]
+
+    @staticmethod
+    def cache_path(file_path, cache_dir: Optional[str] = None) -> Path:
+        """Where the compiled index of file_path lives: next to it, or hashed into cache_dir"""
+        if cache_dir is None:
+            return Path(f"{file_path}{INDEX_CACHE_SUFFIX}")
+        digest = hashlib.sha1(str(Path(file_path).resolve()).encode('utf-8')).hexdigest()
+        return Path(cache_dir) / f"{digest}{INDEX_CACHE_SUFFIX}"
+
+    @classmethod
+    def load(cls, file_path, cache_dir: Optional[str] = None, use_mmap: bool = False) -> Optional['SectionIndex']:
+        """Return the index of file_path from its compiled cache, re-parsing only if the file changed"""
+        cache_file = cls.cache_path(file_path, cache_dir)
+        try:
+            stamp = cls.file_stamp(file_path)
+        except OSError as e:
+            print(f"Error reading file: {e}")
+            return None
+
+        index = cls.from_cache(file_path, cache_file, use_mmap)
+        if index is not None and index.source_stamp == stamp:
+            return index
+
+        index = cls.parse(file_path, use_mmap)
+        if index is not None:
+            try:
+                index.save_cache(cache_file)
+            except OSError as e:
+                print(f"Warning: could not write section index {cache_file}: {e}")
+        return index
+
+    def save_cache(self, cache_file):
+        """Write the compiled index: numbers, titles, levels and byte ranges in document order"""
+        data = {
+            "version": INDEX_CACHE_VERSION,
+            "source_stamp": self.source_stamp,
+            "sections": [
+                [s.number, s.title, s.level, s.start, s.end, s.parent.number if s.parent else None]
+                for s in self.all_sections
+            ],
+        }
+        cache_file = Path(cache_file)
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = cache_file.with_name(cache_file.name + ".tmp")
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f, separators=(',', ':'))
+        os.replace(tmp_file, cache_file)
+
+    @classmethod
+    def from_cache(cls, file_path, cache_file, use_mmap: bool = False) -> Optional['SectionIndex']:
+        """Rebuild an index from its compiled cache, or None if there is no usable cache"""
+        try:
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get("version") != INDEX_CACHE_VERSION:
+            return None
+
+        index = cls(file_path, use_mmap)
+        index.source_stamp = data["source_stamp"]
+        by_number: Dict[str, MarkdownSection] = {}
+        for number, title, level, start, end, parent_number in data["sections"]:
+            section = MarkdownSection(title, level, start=start, end=end, source=index)
+            index.all_sections.append(section)
+            by_number[number] = section
+            if parent_number is None:
+                index.root_sections.append(section)
+            else:
+                parent = by_number[parent_number]
+                parent.subsections.append(section)
+                section.parent = parent
+
+        index.number_sections()
+        return index
+
+    def _map(self) -> mmap.mmap:
+        if self._closed:
+            raise ValueError(f"Section index of {self.file_path} is closed")
+        if self._mmap is None:
+            with open(self.file_path, 'rb') as f:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._mmap
+
+    def _unmap(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    def close(self):
+        """Release the memory map, if one is open; a closed index can no longer read sections"""
+        self._closed = True
+        self._unmap()
+
+    def iter_range(self, start: int, end: int) -> Iterator[str]:
+        """Yield one section's text in blocks, straight from the file without loading the rest"""
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        pending_cr = False
+
+        def blocks():
+            if self.use_mmap:
+                data = self._map()
+                for pos in range(start, end, READ_BLOCK_SIZE):
+                    yield data[pos:min(pos + READ_BLOCK_SIZE, end)]
+            else:
+                with open(self.file_path, 'rb') as f:
+                    f.seek(start)
+                    remaining = end - start
+                    while remaining > 0:
+                        block = f.read(min(READ_BLOCK_SIZE, remaining))
+                        if not block:
+                            break
+                        remaining -= len(block)
+                        yield block
+
+        for block in blocks():
+            text = decoder.decode(block)
+            # Hold back a trailing \r so a \r\n split across blocks becomes one newline
+            if pending_cr:
+                text = '\r' + text
+            pending_cr = text.endswith('\r')
+            if pending_cr:
+                text = text[:-1]
+            if text:
+                yield normalize_newlines(text)
+
+        tail = decoder.decode(b'', final=True)
+        if pending_cr or tail:
+            yield normalize_newlines(('\r' if pending_cr else '') + tail)
+
+    def read_range(self, start: int, end: int) -> str:
+        """Read one section's text"""
+        return ''.join(self.iter_range(start, end))
+
+    def write_range(self, start: int, end: int, f: TextIO):
+        """Copy one section's text to f block by block"""
+        for text in self.iter_range(start, end):
+            f.write(text)
+
+    @classmethod
+    def parse(cls, file_path: str, use_mmap: bool = False) -> Optional['SectionIndex']:
+        """Read and parse a markdown file; returns None if it is missing or empty.
+
+        The file is scanned through a memory map, so only one section at a time is
+        ever copied into Python objects.
+        """
+        index = cls(file_path, use_mmap)
+        try:
+            stamp = cls.file_stamp(file_path)
+            if not stamp[1]:
+                return None
+            data = index._map()
+        except Exception as e:
+            print(f"Error reading file: {e}")
+            return None
+
+        index.source_stamp = stamp
+        try:
+            index.parse_bytes(data)
+        except UnicodeDecodeError as e:
+            print(f"Error reading file: {e}")
+            return None
+        finally:
+            if not use_mmap:
+                index._unmap()
+        return index
+
+    def iter_raw_sections(self, data: bytes):
+        """Yield (start, end) byte ranges of the separator-delimited chunks"""
+        start = 0
+        for match in SECTION_SEPARATOR.finditer(data):
+            yield start, match.start()
+            start = match.end()
+        yield start, len(data)
+
+    def parse_bytes(self, data: bytes):
+        """Build the section tree from the raw file contents"""
+        last_section_by_level = {}
+
+        for raw_start, raw_end in self.iter_raw_sections(data):
+            raw_text = data[raw_start:raw_end].decode('utf-8')
+            stripped = raw_text.strip()
+
+            # Find the first header in the section
+            header_match = HEADER_PATTERN.match(normalize_newlines(stripped))
+            if not header_match:
+                continue
+
+            hashes, title = header_match.groups()
+            level = len(hashes)
+
+            # Convert the stripped character span back to byte offsets
+            lead = len(raw_text) - len(raw_text.lstrip())
+            start = raw_start + len(raw_text[:lead].encode('utf-8'))
+            end = start + len(stripped.encode('utf-8'))
+
+            # Only the offsets are kept; content is read back from the file on demand
+            new_section = MarkdownSection(
+                title=title,
+                level=level,
+                start=start,
+                end=end,
+                source=self,
+            )
+            self.all_sections.append(new_section)
+
+            # Handle hierarchy
+            parent_levels = [l for l in last_section_by_level if l < level]
+            if level == 1 or not parent_levels:
+                self.root_sections.append(new_section)
+            else:
+                parent = last_section_by_level[max(parent_levels)]
+                parent.subsections.append(new_section)
+                new_section.parent = parent
+
+            last_section_by_level[level] = new_section
+
+        self.number_sections()
+
+    def number_sections(self, sections: Optional[List[MarkdownSection]] = None, parent_num: str = ""):
+        """Assign hierarchical numbers (1, 1.2, 1.2.1, ...) and fill section_map"""
+        if sections is None:
+            sections = self.root_sections
+            self.section_map.clear()
+
+        for i, section in enumerate(sections, 1):
+            section.number = f"{parent_num}{i}" if parent_num else str(i)
+            self.section_map[section.number] = section
+
+            if section.subsections:
+                self.number_sections(section.subsections, f"{section.number}.")
@@ -0,0 +1,147 @@
+import contextlib
+import contextvars
+import itertools
+import json
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, Iterator, Optional
+
+# Recent durations kept per span name for the percentiles in metrics()
+SAMPLE_WINDOW = 1000
+
+
+class Span:
+    """One timed operation; attributes carry sizes such as bytes or token counts"""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, name: str, parent: Optional["Span"] = None, **attributes):
+        self.name = name
+        self.span_id = next(self._ids)
+        self.parent = parent
+        self.trace_id = parent.trace_id if parent else self.span_id
+        self.attributes = dict(attributes)
+        self.start = time.time()
+        self._started = time.perf_counter()
+        self.duration: Optional[float] = None
+        self.error: Optional[str] = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def add(self, key: str, amount: float):
+        """Accumulate a counter attribute, e.g. bytes received so far"""
+        self.attributes[key] = self.attributes.get(key, 0) + amount
+
+    def elapsed(self) -> float:
+        """Seconds since the span started, while it is still running"""
+        return time.perf_counter() - self._started
+
+    def mark(self, key: str):
+        """Record the elapsed time as an attribute, e.g. when the first token arrived"""
+        self.attributes[key] = round(self.elapsed(), 6)
+
+    def to_dict(self) -> dict:
+        return {
+            "trace": self.trace_id,
+            "span": self.span_id,
+            "parent": self.parent.span_id if self.parent else None,
+            "name": self.name,
+            "start": round(self.start, 6),
+            "duration": round(self.duration, 6) if self.duration is not None else None,
+            "error": self.error,
+            **self.attributes,
+        }
+
+
+class Tracer:
+    """Collects nested spans per query and aggregates their latencies.
+
+    Spans nest through a context variable, so concurrent queries on one event loop
+    each get their own tree. Finished spans are written as JSON lines when an
+    output file is set, and always folded into the per-name metrics().
+    """
+
+    def __init__(self, output_file: Optional[str] = None):
+        self.current: "contextvars.ContextVar[Optional[Span]]" = contextvars.ContextVar("current_span", default=None)
+        self.lock = threading.Lock()
+        self.output = None
+        self.stats: Dict[str, dict] = {}
+        self.samples: Dict[str, Deque[float]] = {}
+        if output_file:
+            self.set_output(output_file)
+
+    def set_output(self, output_file: Optional[str]):
+        """Append finished spans to output_file as JSON lines (None stops writing)"""
+        with self.lock:
+            if self.output:
+                self.output.close()
+            self.output = open(output_file, 'a', encoding='utf-8') if output_file else None
+
+    @contextlib.contextmanager
+    def span(self, name: str, **attributes) -> Iterator[Span]:
+        """Time the block as a child of the current span"""
+        span = Span(name, self.current.get(), **attributes)
+        token = self.current.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            self.current.reset(token)
+            self.finish(span)
+
+    def start(self, name: str, **attributes) -> Span:
+        """Open a span without making it current; for work spread over callbacks or generators.
+
+        The caller must pass it to finish().
+        """
+        return Span(name, self.current.get(), **attributes)
+
+    def annotate(self, **attributes):
+        """Set attributes on the current span, if there is one"""
+        span = self.current.get()
+        if span is not None:
+            span.set(**attributes)
+
+    def finish(self, span: Span):
+        span.duration = span.elapsed()
+        record = span.to_dict()
+        with self.lock:
+            stats = self.stats.setdefault(span.name, {"count": 0, "errors": 0, "total_seconds": 0.0,
+                                                      "max_seconds": 0.0})
+            stats["count"] += 1
+            stats["errors"] += span.error is not None
+            stats["total_seconds"] += span.duration
+            stats["max_seconds"] = max(stats["max_seconds"], span.duration)
+            for key, value in span.attributes.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    stats[f"total_{key}"] = stats.get(f"total_{key}", 0) + value
+            self.samples.setdefault(span.name, deque(maxlen=SAMPLE_WINDOW)).append(span.duration)
+            if self.output:
+                self.output.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+                self.output.flush()
+
+    def metrics(self) -> Dict[str, dict]:
+        """Per span name: count, errors, total/mean/max/p50/p95 seconds and summed attributes"""
+        with self.lock:
+            report = {}
+            for name, stats in sorted(self.stats.items()):
+                samples = sorted(self.samples[name])
+                entry = dict(stats)
+                entry["mean_seconds"] = stats["total_seconds"] / stats["count"]
+                entry["p50_seconds"] = samples[len(samples) // 2]
+                entry["p95_seconds"] = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+                report[name] = {key: round(value, 6) if isinstance(value, float) else value
+                                for key, value in entry.items()}
+            return report
+
+
+# The process-wide tracer used by the pipeline, the API handler and the server
+tracer = Tracer()
+span = tracer.span
+start_span = tracer.start
+finish_span = tracer.finish
+annotate = tracer.annotate
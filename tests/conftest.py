@@ -0,0 +1,42 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path[:0] = [str(ROOT), str(ROOT / "benchmarks")]
+
+import apiClients  # noqa: E402
+import elevenLabsTTS  # noqa: E402
+from corpora import generate_knowledge_base, generate_reference_file  # noqa: E402
+from fakeServers import LatencyProfile, start_fake_apis  # noqa: E402
+
+
+@pytest.fixture
+def fake_apis(monkeypatch):
+    """Fake Claude and ElevenLabs servers that the repo's default clients talk to.
+
+    The shared Anthropic clients are built with the placeholder '' key, so the
+    endpoint and key come from the environment, exactly as in a real run.
+    """
+    servers, claude_url, eleven_base = start_fake_apis(LatencyProfile(first_byte=0.01, per_chunk=0.0))
+    monkeypatch.setenv("ANTHROPIC_BASE_URL", claude_url)
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "test")
+    monkeypatch.setattr(elevenLabsTTS, "API_BASE", eleven_base)
+    apiClients.close_sync_clients()
+    try:
+        yield claude_url, eleven_base
+    finally:
+        apiClients.close_sync_clients()
+        for server in servers:
+            server.shutdown()
+
+
+@pytest.fixture
+def knowledge_base(tmp_path):
+    """A small generated knowledge base: (base_path, reference_file, reference titles)"""
+    base_path = tmp_path / "Working"
+    reference_file = tmp_path / "Ports.txt"
+    titles = generate_reference_file(reference_file, 4, seed=1)
+    generate_knowledge_base(base_path, titles, 20_000)
+    return base_path, reference_file, titles
@@ -0,0 +1,46 @@
+import asyncio
+import json
+
+import apiClients
+import elevenLabsTTS
+from apiCassette import RECORD, REPLAY, Cassette
+from fakeServers import FINAL_ANSWER
+from fastORC import APIHandler
+
+UNREACHABLE = "http://127.0.0.1:9"
+
+
+def answer_and_speak(output_file) -> str:
+    async def run():
+        handler = APIHandler(headless=True)
+        try:
+            return await handler.answer_and_speak("How do I test SSH?", "Help text", output_file=str(output_file))
+        finally:
+            await apiClients.close_async_clients()
+
+    return asyncio.run(run())
+
+
+def test_record_then_replay_claude_and_speech(fake_apis, tmp_path, monkeypatch):
+    """Both the Anthropic SDK's and the ElevenLabs traffic are recorded, then replayed offline"""
+    monkeypatch.setattr(apiClients, "settings", apiClients.settings)
+    cassette_file = tmp_path / "run.cassette"
+
+    apiClients.configure(cassette=Cassette(str(cassette_file), RECORD))
+    recorded = answer_and_speak(tmp_path / "recorded.wav")
+    with open(cassette_file, 'r', encoding='utf-8') as f:
+        urls = [json.loads(line)["url"] for line in f]
+    assert any(url.endswith("/v1/messages") for url in urls)
+    assert any("/text-to-speech/" in url for url in urls)
+
+    # Nothing listens on the replay endpoints; every answer has to come from the cassette
+    monkeypatch.setenv("ANTHROPIC_BASE_URL", UNREACHABLE)
+    monkeypatch.setattr(elevenLabsTTS, "API_BASE", f"{UNREACHABLE}/v1")
+    replay = Cassette(str(cassette_file), REPLAY, speed=0)
+    apiClients.configure(cassette=replay)
+    replayed = answer_and_speak(tmp_path / "replayed.wav")
+
+    assert recorded.strip() == FINAL_ANSWER
+    assert replayed == recorded
+    assert replay.replayed == len(urls)
+    assert (tmp_path / "replayed.wav").read_bytes() == (tmp_path / "recorded.wav").read_bytes()
@@ -0,0 +1,46 @@
+import asyncio
+
+import apiClients
+from fakeServers import FINAL_ANSWER, SELECTION_ANSWER
+from fastORC import APIHandler
+from responseCache import ResponseCache
+
+
+def test_default_async_client_answers_section_selection(fake_apis):
+    """APIHandler.claude, as fastORC uses it, is accepted by the SDK and reaches the API"""
+    async def select():
+        handler = APIHandler()
+        try:
+            return await handler.request_claude("How do I test SSH?", "1. SSH", is_section_selection=True)
+        finally:
+            await apiClients.close_async_clients()
+
+    assert asyncio.run(select()) == SELECTION_ANSWER
+
+
+def test_default_sync_client_answers(fake_apis):
+    """The shared synchronous client used by the standalone scripts"""
+    message = apiClients.anthropic_client('').messages.create(
+        model="claude-test", max_tokens=100, messages=[{"role": "user", "content": "How do I test SSH?"}])
+
+    assert message.content[0].text == FINAL_ANSWER
+
+
+def test_cached_response_is_answered_without_the_api(fake_apis, tmp_path, monkeypatch):
+    """A repeated request is served from the response cache once the API is out of reach"""
+    cache = ResponseCache(str(tmp_path / "responses.db"))
+
+    async def select():
+        handler = APIHandler(response_cache=cache)
+        try:
+            return await handler.request_claude("How do I test SSH?", "1. SSH", is_section_selection=True)
+        finally:
+            await apiClients.close_async_clients()
+
+    first = asyncio.run(select())
+    monkeypatch.setenv("ANTHROPIC_BASE_URL", "http://127.0.0.1:9")
+    second = asyncio.run(select())
+    cache.close()
+
+    assert first == second == SELECTION_ANSWER
+    assert cache.hits == 1
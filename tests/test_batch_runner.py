@@ -0,0 +1,39 @@
+import asyncio
+import json
+from pathlib import Path
+
+import apiClients
+from batchRunner import run_batch_file
+from fakeServers import FINAL_ANSWER
+from fastORC import APIHandler
+from pipelineEngine import QueryPipeline
+
+
+def test_batch_file_answers_every_query_and_shares_duplicates(fake_apis, knowledge_base, tmp_path):
+    base_path, reference_file, titles = knowledge_base
+    input_file, output_file = tmp_path / "queries.jsonl", tmp_path / "results.jsonl"
+    input_file.write_text("\n".join([
+        json.dumps({"id": "first", "query": f"how do I test {titles[0].lower()}"}),
+        f"how do I test {titles[1].lower()}",
+        json.dumps(f"how do I test  {titles[0].lower()} "),
+        "",
+    ]), encoding='utf-8')
+
+    async def run():
+        pipeline = QueryPipeline(APIHandler(headless=True), str(base_path), str(reference_file))
+        try:
+            return await run_batch_file(pipeline, str(input_file), str(output_file), parallelism=2)
+        finally:
+            await apiClients.close_async_clients()
+
+    assert asyncio.run(run()) == 0
+    with open(output_file, 'r', encoding='utf-8') as f:
+        results = {record["id"]: record for record in map(json.loads, f)}
+
+    assert set(results) == {"first", 2, 3}
+    for record, title in [(results["first"], titles[0]), (results[2], titles[1]), (results[3], titles[0])]:
+        assert record["error"] is None
+        assert record["answer"] == FINAL_ANSWER
+        assert Path(record["markdown_path"]).name == f"{title}.md"
+    # The repeated query (extra whitespace aside) reused the first one's run
+    assert [results[key]["deduplicated"] for key in ("first", 2, 3)] == [False, False, True]
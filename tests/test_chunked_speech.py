@@ -0,0 +1,113 @@
+import asyncio
+import threading
+import time
+import wave
+
+import pytest
+
+import apiClients
+import elevenLabsTTS
+from elevenLabsTTS import async_iter_chunked_speech, split_text_chunks
+from fakeServers import PCM_SAMPLE_RATE, FakeElevenLabsHandler, LatencyProfile, start_server
+from fastORC import APIHandler
+
+TEXT = (
+    "Start with a banner grab to learn the exact version. Then look the version up in the advisories. "
+    "Check for default credentials next.\n\n"
+    "If anonymous access is allowed, list everything it exposes. Weak ciphers are worth noting as well. "
+    "Finally, review the logs to see whether any of this was detected by the monitoring in place."
+)
+MAX_CHARS = 80
+
+
+def expected_bytes(text: str, profile: LatencyProfile) -> int:
+    """Length of the PCM the fake server returns for text"""
+    seconds = max(0.2, len(text) / profile.chars_per_second)
+    return int(seconds * PCM_SAMPLE_RATE) * 2
+
+
+class FlakyElevenLabsHandler(FakeElevenLabsHandler):
+    """Fails the first request with a 503, then behaves"""
+
+    lock = threading.Lock()
+    failures_left = 1
+
+    def do_POST(self):
+        with self.lock:
+            fail = FlakyElevenLabsHandler.failures_left > 0
+            FlakyElevenLabsHandler.failures_left -= fail
+        if not fail:
+            return super().do_POST()
+        self.read_json()
+        body = b'{"detail": "busy"}'
+        self.send_response(503)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def tts_server(monkeypatch):
+    servers = []
+
+    def start(handler=FakeElevenLabsHandler, profile=LatencyProfile(first_byte=0.01, per_chunk=0.0)):
+        server, url = start_server(handler, profile)
+        servers.append(server)
+        monkeypatch.setattr(elevenLabsTTS, "API_BASE", f"{url}/v1")
+        return profile
+
+    yield start
+    for server in servers:
+        server.shutdown()
+
+
+def collect(text: str, **kwargs):
+    async def run():
+        try:
+            return [chunk async for chunk in async_iter_chunked_speech(text, "voice", "key", "model", **kwargs)]
+        finally:
+            await apiClients.close_async_clients()
+
+    return asyncio.run(run())
+
+
+def test_chunks_are_synthesized_in_parallel_and_yielded_in_order(tts_server):
+    profile = tts_server(profile=LatencyProfile(first_byte=0.3, per_chunk=0.0))
+    chunks = split_text_chunks(TEXT, MAX_CHARS)
+    assert len(chunks) >= 5
+
+    started = time.perf_counter()
+    audio = collect(TEXT, max_parallel=len(chunks), max_chars=MAX_CHARS)
+    elapsed = time.perf_counter() - started
+
+    assert [len(piece) for piece in audio] == [expected_bytes(chunk, profile) for chunk in chunks]
+    # One after another the chunks would take at least 0.3 s each
+    assert elapsed < 0.3 * len(chunks) * 0.6
+
+
+def test_failed_chunk_is_retried(tts_server, monkeypatch):
+    monkeypatch.setattr(FlakyElevenLabsHandler, "failures_left", 1)
+    profile = tts_server(FlakyElevenLabsHandler)
+    chunks = split_text_chunks(TEXT, MAX_CHARS)
+
+    audio = collect(TEXT, max_parallel=1, max_chars=MAX_CHARS, retries=2)
+
+    assert FlakyElevenLabsHandler.failures_left == 0
+    assert [len(piece) for piece in audio] == [expected_bytes(chunk, profile) for chunk in chunks]
+
+
+def test_speak_text_in_chunks_saves_the_whole_answer(fake_apis, tmp_path):
+    output_file = tmp_path / "answer.wav"
+
+    async def speak():
+        handler = APIHandler(headless=True, tts_parallelism=3)
+        try:
+            return await handler.speak_text(TEXT, str(output_file))
+        finally:
+            await apiClients.close_async_clients()
+
+    assert asyncio.run(speak())
+    profile = LatencyProfile()
+    with wave.open(str(output_file), 'rb') as wav:
+        assert wav.getframerate() == PCM_SAMPLE_RATE
+        assert wav.getnframes() * 2 == sum(expected_bytes(chunk, profile) for chunk in split_text_chunks(TEXT))
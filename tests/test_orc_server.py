@@ -0,0 +1,56 @@
+import asyncio
+
+import httpx
+
+import apiClients
+from fakeServers import FINAL_ANSWER
+from fastORC import APIHandler
+from orcServer import PipelineServer
+from pipelineEngine import QueryPipeline
+
+
+def test_concurrent_queries_and_bad_bodies(fake_apis, knowledge_base):
+    """Two queries in flight at once are both answered; a body that is not a JSON object is a 400"""
+    base_path, reference_file, titles = knowledge_base
+    loop_stalls = []
+
+    async def serve_and_ask():
+        pipeline = QueryPipeline(APIHandler(), str(base_path), str(reference_file))
+        server = PipelineServer(pipeline)
+        listener = await asyncio.start_server(server.handle_connection, "127.0.0.1", 0)
+        url = f"http://127.0.0.1:{listener.sockets[0].getsockname()[1]}"
+
+        async def watch_loop():
+            # Synchronous stages run in worker threads, so the loop keeps ticking meanwhile
+            while True:
+                started = loop.time()
+                await asyncio.sleep(0.01)
+                loop_stalls.append(loop.time() - started)
+
+        loop = asyncio.get_running_loop()
+        watcher = asyncio.ensure_future(watch_loop())
+        try:
+            async with httpx.AsyncClient(base_url=url, timeout=30) as client:
+                answers = await asyncio.gather(*(client.post("/query", json={"query": f"how do I test {title}"})
+                                                 for title in titles[:2]))
+                bad = [await client.post("/query", content=body) for body in (b"[]", b"3", b"{}")]
+                health = (await client.get("/health")).json()
+        finally:
+            watcher.cancel()
+            listener.close()
+            await listener.wait_closed()
+            await apiClients.close_async_clients()
+        return answers, bad, health
+
+    apiClients.sdk()  # a one-off import, as PipelineServer.serve() does before taking requests
+    answers, bad, health = asyncio.run(serve_and_ask())
+
+    for response, title in zip(answers, titles):
+        body = response.json()
+        assert response.status_code == 200
+        assert body["error"] is None
+        assert body["markdown_path"].endswith(f"{title}.md")
+        assert body["answer"].strip() == FINAL_ANSWER
+    assert [response.status_code for response in bad] == [400, 400, 400]
+    assert health["queries_served"] == 2
+    assert max(loop_stalls) < 1.0
@@ -0,0 +1,72 @@
+import os
+import threading
+
+import pipelineEngine
+from corpora import generate_markdown
+from pipelineEngine import QueryPipeline, RequestContext
+
+
+def help_for(pipeline: QueryPipeline, path) -> RequestContext:
+    ctx = RequestContext("query")
+    ctx.markdown_path = str(path)
+    ctx.section_numbers = ["1", "2"]
+    assert pipeline.list_sections(ctx)
+    assert pipeline.build_help(ctx)
+    return ctx
+
+
+def test_evicted_and_changed_files_release_their_indexes(tmp_path, monkeypatch):
+    monkeypatch.setattr(pipelineEngine, "MAX_CACHED_MARKDOWN", 2)
+    pipeline = QueryPipeline(None, use_mmap=True, index_cache_dir=str(tmp_path / "indexes"))
+    files = []
+    for i in range(3):
+        files.append(tmp_path / f"file{i}.md")
+        generate_markdown(files[-1], 20_000, seed=i)
+
+    help_for(pipeline, files[0])
+    first = pipeline._markdown_cache[str(files[0])]
+    index = first.values["index"]
+    assert first.values["batch"].index is index
+    help_for(pipeline, files[1])
+    help_for(pipeline, files[2])
+    # The least recently used file went out with its index, section list and extractor together
+    assert str(files[0]) not in pipeline._markdown_cache
+    assert first.closed and index._mmap is None
+
+    current = pipeline._markdown_cache[str(files[2])]
+    generate_markdown(files[2], 25_000, seed=9)
+    os.utime(files[2], ns=(0, current.mtime + 1))
+    ctx = help_for(pipeline, files[2])
+    assert current.closed
+    assert pipeline._markdown_cache[str(files[2])] is not current
+    assert ctx.help_text
+
+
+def test_entry_in_use_is_closed_only_after_the_query_lets_go(tmp_path, monkeypatch):
+    monkeypatch.setattr(pipelineEngine, "MAX_CACHED_MARKDOWN", 1)
+    pipeline = QueryPipeline(None, use_mmap=True, index_cache_dir=str(tmp_path / "indexes"))
+    busy, other = tmp_path / "busy.md", tmp_path / "other.md"
+    generate_markdown(busy, 20_000, seed=1)
+    generate_markdown(other, 20_000, seed=2)
+    help_for(pipeline, busy)
+
+    holding, evicted = threading.Event(), threading.Event()
+
+    def slow_query():
+        with pipeline._markdown(str(busy)) as entry:
+            holding.set()
+            evicted.wait(5)
+            # Still readable although the entry was evicted meanwhile
+            entry.values["batch"].build_help_document(["1"])
+        return entry
+
+    result = []
+    thread = threading.Thread(target=lambda: result.append(slow_query()))
+    thread.start()
+    holding.wait(5)
+    help_for(pipeline, other)
+    assert str(busy) not in pipeline._markdown_cache
+    evicted.set()
+    thread.join(5)
+
+    assert result and result[0].evicted and result[0].closed
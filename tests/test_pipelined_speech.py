@@ -0,0 +1,27 @@
+import asyncio
+import wave
+
+import apiClients
+from fakeServers import FINAL_ANSWER, PCM_SAMPLE_RATE
+from fastORC import APIHandler
+
+
+def test_answer_and_speak_against_stub_servers(fake_apis, tmp_path):
+    """The streamed Claude answer is returned whole and its speech is saved as a WAV file"""
+    output_file = tmp_path / "answer.wav"
+
+    async def speak():
+        handler = APIHandler(headless=True)
+        try:
+            return await handler.answer_and_speak("How do I test SSH?", "Help text", output_file=str(output_file))
+        finally:
+            await apiClients.close_async_clients()
+
+    answer = asyncio.run(speak())
+
+    assert answer is not None
+    assert answer.strip() == FINAL_ANSWER
+    with wave.open(str(output_file), 'rb') as wav:
+        assert wav.getframerate() == PCM_SAMPLE_RATE
+        # The stub speaks every sentence for at least 0.2 s
+        assert wav.getnframes() >= 0.2 * PCM_SAMPLE_RATE * 3
@@ -0,0 +1,45 @@
+import threading
+import time
+import wave
+
+import pytest
+
+from audioStream import PCM_CHANNELS, PCM_SAMPLE_RATE, PlaybackWorker
+
+pygame = pytest.importorskip("pygame")
+
+HALF_SECOND_PCM = b"\x00\x10" * (PCM_SAMPLE_RATE // 2)
+
+
+def test_encoded_files_play_in_the_default_mixer_format(tmp_path, monkeypatch):
+    """PCM clips and a stereo WAV file play in order, the file without being downmixed"""
+    monkeypatch.setenv("SDL_AUDIODRIVER", "dummy")
+    stereo_file = tmp_path / "stereo.wav"
+    with wave.open(str(stereo_file), 'wb') as wav:
+        wav.setnchannels(2)
+        wav.setsampwidth(2)
+        wav.setframerate(44100)
+        wav.writeframes(b"\x00\x10\x00\x10" * 22050)
+
+    formats = set()
+    stop = threading.Event()
+
+    def watch():
+        while not stop.is_set():
+            formats.add(pygame.mixer.get_init())
+            time.sleep(0.02)
+
+    worker = PlaybackWorker()
+    watcher = threading.Thread(target=watch, daemon=True)
+    watcher.start()
+    try:
+        played = [worker.play_pcm(HALF_SECOND_PCM), worker.play_file(str(stereo_file)),
+                  worker.play_pcm(HALF_SECOND_PCM)]
+        assert [future.result(10) for future in played] == [True, True, True]
+    finally:
+        stop.set()
+        watcher.join()
+        worker.close()
+
+    channels = {mixer_format[2] for mixer_format in formats if mixer_format}
+    assert channels == {PCM_CHANNELS, 2}